@@ -4,6 +4,14 @@ document.addEventListener('DOMContentLoaded', () => {
     const loadingSpinner = document.getElementById("loading");
     const responseContainer = document.getElementById("response");
 
+    const API_URL = 'http://127.0.0.1:5000';
+    const SOLVE_DEBOUNCE_MS = 300;  // Wait this long after the last click before sending a solve
+
+    // Identifies this page to the server, so a newer solve cancels the previous one
+    const sessionId = (window.crypto && crypto.randomUUID) ? crypto.randomUUID() : String(Math.random()).slice(2);
+    let solveController = null;  // AbortController of the solve request in flight
+    let solveTimer = null;  // Pending debounced solve
+
     // Function to create the empty grid
     function createGrid() {
         gridContainer.innerHTML = ''; // Clear any existing grid
@@ -16,7 +24,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const cell = document.createElement('input');
                 cell.type = 'text';
                 cell.id = `cell${i * 4 + j + 1}`;  // Unique ID for each cell
-                cell.maxLength = 1;  // Only allow one letter per cell
+                cell.maxLength = 2;  // One letter per cell, or a two-letter tile such as "Qu" ("?" is a wildcard)
                 cell.classList.add('grid-cell');
                 row.appendChild(cell);
 
@@ -37,6 +45,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // Reset Button functionality
     const resetButton = document.getElementById('reset-btn');
     resetButton.addEventListener('click', () => {
+        cancelSolve();  // Nobody is waiting for the old answer any more
         createGrid();  // Re-create the empty grid and reset the theme input
         responseContainer.innerHTML = '';  // Clear the response area
     });
@@ -57,8 +66,14 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // Handle input (when a letter is typed in the cell)
     function handleInput(row, col) {
-        // Automatically move to the next cell when a letter is typed
-        moveToNextCell(row, col);
+        // Editing the board makes any running solve stale
+        cancelSolve();
+
+        // Automatically move to the next cell when a letter is typed, unless it may be the start of a "Qu" tile
+        const value = document.getElementById(`cell${row * 4 + col + 1}`).value;
+        if (value.toUpperCase() !== 'Q') {
+            moveToNextCell(row, col);
+        }
     }
 
     // Function to move focus to the next cell
@@ -79,6 +94,31 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Function to abort the solve in flight (and any pending one) and tell the server to stop working on it
+    function cancelSolve() {
+        // The spinner shows from the click, so hide it whether the solve was still debouncing or already sent
+        if (solveTimer || solveController) {
+            loadingSpinner.style.display = 'none';
+        }
+
+        clearTimeout(solveTimer);
+        solveTimer = null;
+
+        if (solveController) {
+            solveController.abort();
+            solveController = null;
+
+            fetch(`${API_URL}/cancel`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                },
+                body: JSON.stringify({ session_id: sessionId }),
+                keepalive: true,
+            }).catch(() => {});  // Best effort: the server also notices the aborted connection
+        }
+    }
+
     // Function to solve the word salad puzzle
     function solve() {
         // Get the theme and min/max length input values
@@ -119,28 +159,61 @@ document.addEventListener('DOMContentLoaded', () => {
             grid.push(cellValue);
         }
 
+        // Debounce repeated clicks so only the last one is sent
+        clearTimeout(solveTimer);
+        solveTimer = setTimeout(() => sendSolve(grid, theme, minLength, maxLength), SOLVE_DEBOUNCE_MS);
+    }
+
+    // Function to send a solve request, aborting the one it supersedes
+    function sendSolve(grid, theme, minLength, maxLength) {
+        solveTimer = null;
+        if (solveController) {
+            solveController.abort();
+        }
+        const controller = new AbortController();
+        solveController = controller;
+
         // Send the grid letters and theme to the backend for word solving
-        fetch('http://127.0.0.1:5000/solve', {
+        fetch(`${API_URL}/solve`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
             },
-            body: JSON.stringify({ grid: grid, theme: theme, maxLength: maxLength, minLength: minLength })
+            body: JSON.stringify({
+                grid: grid,
+                theme: theme,
+                min_length: Number(minLength),
+                max_length: Number(maxLength),
+                session_id: sessionId,
+            }),
+            signal: controller.signal,
         })
         .then(response => response.json())
         .then(data => {
+            solveController = null;
+
             // Hide the loading spinner after response
             loadingSpinner.style.display = 'none';
 
             // Check if any words were found
             if (data.words && data.words.length > 0) {
-                let wordsList = data.words.join('<br>');
+                // Show which letters any wildcard tiles stood for
+                const wildcards = data.wildcards || {};
+                let wordsList = data.words
+                    .map(word => wildcards[word] ? `${word} (? = ${wildcards[word].join(', ')})` : word)
+                    .join('<br>');
                 responseContainer.innerHTML = "<br>" + wordsList;
             } else {
                 responseContainer.innerHTML = "<br><strong>No words found</strong>";
             }
         })
         .catch(error => {
+            // A superseded or cancelled request isn't an error
+            if (error.name === 'AbortError') {
+                return;
+            }
+            solveController = null;
+
             // Hide the loading spinner in case of error
             loadingSpinner.style.display = 'none';
             console.error('Error:', error);
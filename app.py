@@ -1,134 +1,703 @@
-import nltk
-import requests
-from nltk.corpus import words
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
 from functools import lru_cache
-from flask import Flask, request, jsonify
+from collections import Counter
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
+from dictionary import DictionaryManager, NLTK_DICTIONARY, Trie
+from conceptnet import ConceptNetClient, ConceptNetUnavailable
+from singleflight import SingleFlight
+from cancellation import CancellationToken, SolveCancelled, watch_for_disconnect
+from theme_bitsets import ThemeBitsets
+import threading
+import logging
+import json
 import time
-
-# Download necessary resources
-nltk.download('words')
+import os
 
 app = Flask(__name__)
 CORS(app)  # Allow cross-origin requests
 
-# Load the NLTK words into a set for faster look-up
-valid_words = set(word.lower() for word in words.words())
-valid_words_by_length = {length: set(word for word in valid_words if len(word) == length) for length in range(1, 16)}
+# Directory of local theme vocabularies (one "<theme>.txt" file per theme)
+THEME_VOCABULARY_DIR = os.environ.get("THEME_VOCABULARY_DIR", "themes")
+
+# Directory of precomputed theme bitsets (built offline by build_theme_bitsets.py)
+THEME_BITSET_DIR = os.environ.get("THEME_BITSET_DIR", "theme_bitsets")
+
+# Themes whose vocabularies are fetched during warm-up (comma-separated)
+WARMUP_THEMES = [theme for theme in os.environ.get("WARMUP_THEMES", "planet,chess,food,animals").split(",") if theme]
+
+# Sample boards searched during warm-up so the search path is exercised before the instance reports ready
+WARMUP_BOARDS = [
+    ['V', 'E', 'N', 'U', 'P', 'T', 'A', 'S', 'Y', 'U', 'R', 'M', 'R', 'C', 'N', 'E'],
+    ['P', 'A', 'W', 'E', 'O', 'G', 'N', 'E', 'H', 'I', 'K', 'U', 'T', 'S', 'B', 'Q'],
+]
+
+# Shortest minimum word length for which the "auto" engine searches bidirectionally (see bench.py for the crossover)
+BIDIRECTIONAL_MIN_LENGTH = int(os.environ.get("BIDIRECTIONAL_MIN_LENGTH", "11"))
+
+# Largest number of boards accepted by /solve/batch
+MAX_BATCH_SIZE = int(os.environ.get("MAX_BATCH_SIZE", "1000"))
+
+logger = logging.getLogger(__name__)
+
+# Named dictionaries, loaded lazily; the default one is loaded on a background thread when the server starts
+dictionaries = DictionaryManager(
+    os.environ.get("DICTIONARY_DIR", "dictionaries"),
+    default=os.environ.get("DEFAULT_DICTIONARY", NLTK_DICTIONARY),
+    max_loaded=int(os.environ.get("MAX_LOADED_DICTIONARIES", "3")),
+    halves_min_length=BIDIRECTIONAL_MIN_LENGTH,
+)
+
+# Shared ConceptNet client (hedged requests and a circuit breaker around the upstream API)
+conceptnet = ConceptNetClient()
+
+# Precomputed relatedness for the most common themes, used instead of asking ConceptNet about each found word
+theme_bitsets = ThemeBitsets(THEME_BITSET_DIR)
+
+# Coalesces identical concurrent /solve requests (across worker processes too when SOLVE_COALESCE_DIR is set)
+solve_flights = SingleFlight(os.environ.get("SOLVE_COALESCE_DIR"), ttl=float(os.environ.get("SOLVE_COALESCE_TTL", "5")))
+
+# Cancellation tokens of the solves currently running, by session
+active_solves = {}
+active_solves_lock = threading.Lock()
+
+# Readiness state reported by /readyz
+ready = threading.Event()
+loading_error = None
+loading_thread = None
+
+# Whether searches skip trie subtrees whose words have all been found already. Off by default: only boards that re-find
+# the same words from many paths save enough nodes to pay for the bookkeeping (see bench.py)
+PRUNE_EXHAUSTED = os.environ.get("PRUNE_EXHAUSTED", "0") == "1"
+
+# Tile that stands for any single letter
+WILDCARD = "?"
 
 # Directions for grid traversal (up, down, left, right, and diagonals)
 directions = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)]
 
+# Function to convert the flat grid sent by the frontend into a 2D grid
+def to_grid_2d(grid, width=4):
+    return [grid[i:i+width] for i in range(0, len(grid), width)]
+
+# Function to check that a 2D grid is a non-empty rectangle of tiles, returning what is wrong with it (None if it's valid)
+def grid_error(grid_2d):
+    if not grid_2d or not isinstance(grid_2d[0], list) or not grid_2d[0]:
+        return "Grid is required"
+    if any(not isinstance(row, list) or len(row) != len(grid_2d[0]) for row in grid_2d):
+        return "Grid rows must all have the same number of cells"
+    if any(not isinstance(cell, str) for row in grid_2d for cell in row):
+        return "Grid cells must be strings"
+    return None
+
 # Function to check if a position is valid in the grid
 def is_valid(x, y, grid):
     return 0 <= x < len(grid) and 0 <= y < len(grid[0])
 
-# Optimized Trie implementation for storing valid words
-class TrieNode:
-    def __init__(self):
-        self.children = {}
-        self.is_end_of_word = False
+# Function to list the ways a tile continues a trie node, as (letters, child node, letter taken by a wildcard or None).
+# Tiles can hold several letters (e.g. "Qu"), and a wildcard only expands into the children that exist at the node.
+def tile_children(node, tile):
+    if tile == WILDCARD:
+        for letter, child in node.children.items():
+            yield letter, child, letter
+        return
+
+    child = node
+    for letter in tile:
+        child = child.children.get(letter)
+        if child is None:
+            return
+    if tile:
+        yield tile, child, None
+
+# Function to count how many letters of a word a tile matches at a position (0 if it doesn't match)
+def tile_match_length(tile, word, index):
+    if tile == WILDCARD:
+        return 1 if index < len(word) else 0
+    return len(tile) if tile and word.startswith(tile, index) else 0
+
+# Per-search overlay on a shared trie that counts the words still unfound below each node, so subtrees with nothing
+# left to find are skipped. The trie's own word counts are the starting point and the trie itself is never changed.
+# Also counts the nodes the search expanded and the subtrees it skipped (approximately when searching on several threads).
+# With prune=False nothing is skipped, so the counts show what the search costs without the overlay.
+class SearchProgress:
+    def __init__(self, root, prune=True):
+        self.root = root
+        self.prune = prune
+        self.remaining = {}  # node -> words still unfound below it, for the nodes that have had a word found
+        self.resolved = set()
+        self.expanded = 0
+        self.pruned = 0
+        self._lock = threading.Lock()
+
+    # Function to count a word as found along the trie nodes spelling it, the first time it is found
+    def resolve(self, word):
+        if not self.prune or word in self.resolved:
+            return
+        with self._lock:
+            if word in self.resolved:
+                return
+            self.resolved.add(word)
+            node = self.root
+            for letter in word:
+                node = node.children[letter]
+                self.remaining[node] = self.remaining.get(node, node.word_count) - 1
+
+    def stats(self):
+        return {"expanded": self.expanded, "pruned": self.pruned}
+
+# Function to search words using DFS, walking the trie alongside the grid so dead prefixes are pruned immediately
+# (and, with a SearchProgress, subtrees whose words have all been found already)
+def find_words_dfs(x, y, current_word, node, visited, min_length, max_length, grid, found_words, cancel_token=None, wildcard_letters=(), wildcards=None, progress=None):
+    # Give up as soon as nobody is waiting for the result any more
+    if cancel_token is not None and cancel_token.cancelled:
+        raise SolveCancelled(cancel_token.reason)
+    if progress is not None:
+        progress.expanded += 1
 
-class Trie:
-    def __init__(self):
-        self.root = TrieNode()
-    
-    def insert(self, word):
-        node = self.root
-        for char in word:
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
-        node.is_end_of_word = True
-    
-    def search(self, word):
-        node = self.root
-        for char in word:
-            if char not in node.children:
-                return False
-            node = node.children[char]
-        return node.is_end_of_word
-    
-    def starts_with(self, prefix):
-        node = self.root
-        for char in prefix:
-            if char not in node.children:
-                return False
-            node = node.children[char]
-        return True
-
-# Build Trie for valid words
-trie = Trie()
-for word in valid_words:
-    trie.insert(word)
-
-# Precompute valid prefixes for words up to the maximum length
-valid_prefixes = {}
-for word in valid_words:
-    for i in range(1, len(word) + 1):
-        prefix = word[:i]
-        if prefix not in valid_prefixes:
-            valid_prefixes[prefix] = set()
-        valid_prefixes[prefix].add(word)
-
-# Function to search words using DFS
-def find_words_dfs(x, y, current_word, visited, min_length, max_length, grid, found_words):
     # If the current word is valid and within the required length range, add it to found words
-    if min_length <= len(current_word) <= max_length and trie.search(current_word):
+    if min_length <= len(current_word) <= max_length and node.is_end_of_word:
         found_words.add(current_word)
 
-    # Prune if the current prefix is not a valid word start
-    if len(current_word) > max_length or current_word not in valid_prefixes:
+        # Remember which letters the wildcards took, preferring the path that needs the fewest of them
+        if wildcards is not None and len(wildcard_letters) < len(wildcards.get(current_word, wildcard_letters + (None,))):
+            wildcards[current_word] = wildcard_letters
+
+    # A word is done with once it has been reached (or is too short to report anyway), except that a word reached
+    # through wildcards stays open while the caller wants to know the fewest wildcards it needs
+    if progress is not None and node.is_end_of_word and (len(current_word) < min_length or wildcards is None or not wildcard_letters):
+        progress.resolve(current_word)
+
+    # Stop once the word can't grow any longer
+    if len(current_word) >= max_length:
         return
 
-    # Explore neighbors
+    # Explore neighbors, but only those whose tile continues a prefix in the trie
     for dx, dy in directions:
         nx, ny = x + dx, y + dy
         if is_valid(nx, ny, grid) and (nx, ny) not in visited:
+            tile = grid[nx][ny]
+            if len(tile) == 1 and tile != WILDCARD:
+                # Most tiles are a single letter, which continues the prefix through at most one child
+                child = node.children.get(tile)
+                if child is None:
+                    continue
+                branches = ((tile, child, None),)
+            else:
+                branches = tile_children(node, tile)
             visited.add((nx, ny))
-            find_words_dfs(nx, ny, current_word + grid[nx][ny].lower(), visited, min_length, max_length, grid, found_words)
+            for letters, child, wildcard_letter in branches:
+                # Skip the subtree if every word in it has already been found from another path
+                if progress is not None and progress.remaining.get(child) == 0:
+                    progress.pruned += 1
+                    continue
+                next_wildcard_letters = wildcard_letters + (wildcard_letter,) if wildcard_letter else wildcard_letters
+                find_words_dfs(nx, ny, current_word + letters, child, visited, min_length, max_length, grid, found_words, cancel_token, next_wildcard_letters, wildcards, progress)
             visited.remove((nx, ny))  # Backtrack
 
-# Function to perform the word search on the grid using multi-threaded DFS
-def word_search(grid, min_length=1, max_length=15):
+# Function to perform the word search on the grid using multi-threaded DFS (against the full dictionary unless a trie is given)
+# With max_workers=1 the search runs on the calling thread, for callers that already run many searches in a pool.
+# If a wildcards dict is given, it is filled with the letters each found word's wildcard tiles took.
+# The engine is "forward", "bidirectional" or "auto", which searches long words bidirectionally when the board allows it.
+# The forward engine skips trie subtrees whose words have all been found if prune_exhausted is True (PRUNE_EXHAUSTED if
+# it isn't given), and fills the `stats` dict, if one is given, with the nodes it expanded and the subtrees it skipped.
+def word_search(grid, min_length=1, max_length=15, words_trie=None, max_workers=8, cancel_token=None, wildcards=None, engine="auto", prune_exhausted=None, stats=None):
+    words_trie = words_trie or dictionaries.get().trie
+
+    # Normalise the tiles once instead of on every visit
+    grid = [[cell.strip().lower() for cell in row] for row in grid]
+
+    # The bidirectional search splits words by letter count, so it only handles boards of single-letter tiles
+    # The forward search's pruning already makes deep paths cheap, so "auto" only pays for the half-word index
+    # when every word in the range is long
+    single_letters = all(len(tile) == 1 and tile != WILDCARD for row in grid for tile in row)
+    if engine == "auto":
+        engine = "bidirectional" if single_letters and min_length >= BIDIRECTIONAL_MIN_LENGTH else "forward"
+    if engine != "bidirectional" or not single_letters:
+        if prune_exhausted is None:
+            prune_exhausted = PRUNE_EXHAUSTED
+        return forward_word_search(grid, min_length, max_length, words_trie, max_workers, cancel_token, wildcards, prune_exhausted, stats)
+
+    # Single letters can't be split in half, so they are found forwards
+    found_words = set()
+    if min_length < 2:
+        found_words = forward_word_search(grid, min_length, 1, words_trie, 1, cancel_token, None, False)
+    return found_words | bidirectional_word_search(grid, max(min_length, 2), max_length, words_trie, cancel_token)
+
+# Function to search the board forwards from every cell (the grid must already hold normalised tiles)
+def forward_word_search(grid, min_length, max_length, words_trie, max_workers, cancel_token, wildcards, prune_exhausted=True, stats=None):
     found_words = set()
+    found_wildcards = {} if wildcards is not None else None
+    progress = SearchProgress(words_trie.root, prune_exhausted) if prune_exhausted or stats is not None else None
 
-    with ThreadPoolExecutor(max_workers=8) as executor:
-        futures = []
-        for i in range(len(grid)):
-            for j in range(len(grid[0])):
-                futures.append(executor.submit(find_words_dfs, i, j, grid[i][j].lower(), set([(i, j)]), min_length, max_length, grid, found_words))
+    starts = []
+    for i in range(len(grid)):
+        for j in range(len(grid[0])):
+            for letters, node, wildcard_letter in tile_children(words_trie.root, grid[i][j]):
+                wildcard_letters = (wildcard_letter,) if wildcard_letter else ()
+                starts.append((i, j, letters, node, set([(i, j)]), min_length, max_length, grid, found_words, cancel_token, wildcard_letters, found_wildcards, progress))
 
-        # Wait for all futures to complete
-        for future in as_completed(futures):
-            future.result()
+    if max_workers <= 1:
+        for args in starts:
+            find_words_dfs(*args)
+        report_wildcards(found_wildcards, wildcards)
+        report_stats(progress, stats)
+        return found_words
 
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(find_words_dfs, *args) for args in starts]
+
+        # Wait for all futures to complete, dropping the cells that haven't started if the search is cancelled
+        try:
+            for future in as_completed(futures):
+                future.result()
+        except SolveCancelled:
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    report_wildcards(found_wildcards, wildcards)
+    report_stats(progress, stats)
     return found_words
 
+# Function to collect the paths spelling a half word, recording (letters, last x, last y, cells used as a bitmask)
+# whenever the letters so far form a complete half in the half trie
+def collect_half_paths(x, y, current_word, node, mask, min_half, max_half, grid, paths, cancel_token=None):
+    if cancel_token is not None and cancel_token.cancelled:
+        raise SolveCancelled(cancel_token.reason)
+
+    if node.is_end_of_word and len(current_word) >= min_half:
+        paths.append((current_word, x, y, mask))
+    if len(current_word) >= max_half:
+        return
+
+    width = len(grid[0])
+    for dx, dy in directions:
+        nx, ny = x + dx, y + dy
+        if is_valid(nx, ny, grid) and not mask & (1 << (nx * width + ny)):
+            child = node.children.get(grid[nx][ny])
+            if child is not None:
+                collect_half_paths(nx, ny, current_word + grid[nx][ny], child, mask | (1 << (nx * width + ny)), min_half, max_half, grid, paths, cancel_token)
+
+# Function to find long words by meeting in the middle: first halves are grown forwards from every cell, second
+# halves are grown backwards from every cell with a trie of reversed second halves, and the two are joined where the
+# first half ends next to the cell the second half starts on, as long as the two paths don't share a cell.
+def bidirectional_word_search(grid, min_length, max_length, words_trie, cancel_token=None):
+    prefix_trie, reverse_trie, split_index = words_trie.halves(min_length)
+    width = len(grid[0])
+
+    prefixes = []
+    suffix_paths = []
+    for i in range(len(grid)):
+        for j in range(len(grid[0])):
+            mask = 1 << (i * width + j)
+            node = prefix_trie.root.children.get(grid[i][j])
+            if node is not None:
+                collect_half_paths(i, j, grid[i][j], node, mask, min_length // 2, max_length // 2, grid, prefixes, cancel_token)
+            node = reverse_trie.root.children.get(grid[i][j])
+            if node is not None:
+                collect_half_paths(i, j, grid[i][j], node, mask, min_length - min_length // 2, max_length - max_length // 2, grid, suffix_paths, cancel_token)
+
+    # Index the second halves by their first cell (the last one reached walking backwards) and their letters
+    suffixes = {}
+    for reversed_suffix, x, y, mask in suffix_paths:
+        suffixes.setdefault((x, y, reversed_suffix[::-1]), []).append(mask)
+
+    found_words = set()
+    for prefix, x, y, mask in prefixes:
+        for suffix in split_index.get(prefix, ()):
+            word = prefix + suffix
+            if word in found_words or not min_length <= len(word) <= max_length:
+                continue
+            for dx, dy in directions:
+                nx, ny = x + dx, y + dy
+                if any(not mask & suffix_mask for suffix_mask in suffixes.get((nx, ny, suffix), ())):
+                    found_words.add(word)
+                    break
+    return found_words
+
+# Function to copy the wildcard letters of the words that needed wildcards into the caller's dict
+def report_wildcards(found_wildcards, wildcards):
+    if wildcards is not None:
+        wildcards.update((word, list(letters)) for word, letters in found_wildcards.items() if letters)
+
+# Function to copy a search's node counts into the caller's stats dict
+def report_stats(progress, stats):
+    if stats is not None and progress is not None:
+        stats.update(progress.stats())
+
+# Function to trace a path of tiles spelling the rest of a word from the last cell in the path
+def trace_word_path(tiles, word, index, path, visited):
+    if index == len(word):
+        return list(path)
+
+    x, y = path[-1]
+    for dx, dy in directions:
+        nx, ny = x + dx, y + dy
+        if is_valid(nx, ny, tiles) and (nx, ny) not in visited:
+            matched = tile_match_length(tiles[nx][ny], word, index)
+            if not matched:
+                continue
+            visited.add((nx, ny))
+            path.append((nx, ny))
+            found_path = trace_word_path(tiles, word, index + matched, path, visited)
+            path.pop()
+            visited.remove((nx, ny))  # Backtrack
+            if found_path:
+                return found_path
+    return None
+
+# Function to find the cell path of a single word, searching only from cells that hold one of its end letters
+def find_word_path(grid, word):
+    word = word.lower()
+    tiles = [[cell.strip().lower() for cell in row] for row in grid]
+    cells = [(i, j) for i in range(len(tiles)) for j in range(len(tiles[0]))]
+
+    # Reject the word early if the board doesn't hold enough of each letter, even with its wildcards
+    board_letters = Counter("".join(tiles[i][j] for i, j in cells if tiles[i][j] != WILDCARD))
+    wildcard_count = sum(1 for i, j in cells if tiles[i][j] == WILDCARD)
+    if not word or sum(max(0, count - board_letters[char]) for char, count in Counter(word).items()) > wildcard_count:
+        return None
+
+    # Start from whichever end of the word fewer cells match, and reverse the path if we searched backwards
+    starts = [(i, j) for i, j in cells if tile_match_length(tiles[i][j], word, 0)]
+    reversed_tiles = [[tile[::-1] for tile in row] for row in tiles]
+    ends = [(i, j) for i, j in cells if tile_match_length(reversed_tiles[i][j], word[::-1], 0)]
+    backwards = len(ends) < len(starts)
+    if backwards:
+        tiles, word = reversed_tiles, word[::-1]
+
+    for i, j in (ends if backwards else starts):
+        path = trace_word_path(tiles, word, tile_match_length(tiles[i][j], word, 0), [(i, j)], set([(i, j)]))
+        if path:
+            return path[::-1] if backwards else path
+    return None
+
+# Function to check a list of candidate words against the board without enumerating the whole dictionary
+def verify_words(grid, candidate_words, min_length=1, max_length=16):
+    paths = {}
+    for word in set(word.lower() for word in candidate_words):
+        if min_length <= len(word) <= max_length:
+            path = find_word_path(grid, word)
+            if path:
+                paths[word] = path
+    return paths
+
+# Function to normalise a theme into the form ConceptNet uses for its concept names
+def normalize_theme(theme):
+    return theme.strip().lower().replace(" ", "_")
+
+# Function to check that a theme names a single concept, since themes become file names and ConceptNet paths
+def is_safe_theme(theme):
+    theme = normalize_theme(theme)
+    return bool(theme) and "/" not in theme and "\\" not in theme and ".." not in theme
+
+# Function to read a theme's local vocabulary file (one related word per line), if there is one
+@lru_cache(maxsize=1000)
+def get_local_theme_vocabulary(theme):
+    # Themes such as "../../x" would read files outside the vocabulary directory
+    if not is_safe_theme(theme):
+        return None
+    path = os.path.join(THEME_VOCABULARY_DIR, f"{normalize_theme(theme)}.txt")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return frozenset(line.strip().lower() for line in f if line.strip())
+
 # Function to check if a word is related to a theme using ConceptNet (caching and optimization)
+# Failures raise ConceptNetUnavailable, which lru_cache doesn't cache, so they are retried once ConceptNet recovers
 @lru_cache(maxsize=10000)  # Cache results for efficiency
 def is_word_related_to_theme_conceptnet(word, theme, threshold=1):
-    url = f"http://api.conceptnet.io/query?node=/c/en/{word}&other=/c/en/{theme}"
-    response = requests.get(url).json()
-    return len(response.get('edges', [])) > 0
+    return conceptnet.is_related(word, theme)
+
+# Function to check if a word is related to a theme, falling back to the local vocabulary while ConceptNet is unavailable
+def is_word_related_to_theme(word, theme, threshold=1):
+    try:
+        return is_word_related_to_theme_conceptnet(word, theme, threshold)
+    except ConceptNetUnavailable:
+        local_vocabulary = get_local_theme_vocabulary(theme)
+        return local_vocabulary is not None and word in local_vocabulary
 
 # Function to filter words based on their relation to the theme using multithreading
-def filter_words_by_theme(words_list, theme, threshold=1):
+def filter_words_by_theme(words_list, theme, threshold=1, cancel_token=None):
     related_words = []
     
     # Using ThreadPoolExecutor to parallelize the checks
-    with ThreadPoolExecutor(max_workers=10) as executor:
-        futures = {executor.submit(is_word_related_to_theme_conceptnet, word, theme, threshold): word for word in words_list}
-        for future in as_completed(futures):
-            word = futures[future]
-            if future.result():  # If the word is related to the theme
-                related_words.append(word)
+    executor = ThreadPoolExecutor(max_workers=10)
+    cancelled = False
+    try:
+        futures = {executor.submit(is_word_related_to_theme, word, theme, threshold): word for word in words_list}
+        pending = set(futures)
+        while pending:
+            # Wake up regularly so a cancelled request stops waiting on slow upstream calls
+            done, pending = wait(pending, timeout=0.1, return_when=FIRST_COMPLETED)
+            if cancel_token is not None and cancel_token.cancelled:
+                cancelled = True
+                raise SolveCancelled(cancel_token.reason)
+            for future in done:
+                if future.result():  # If the word is related to the theme
+                    related_words.append(futures[future])
+    finally:
+        # On cancellation, drop the checks that haven't been sent instead of waiting for them
+        executor.shutdown(wait=not cancelled, cancel_futures=cancelled)
                 
     return related_words
 
+# Function to resolve the words related to a theme, from a local vocabulary file or ConceptNet (cached)
+@lru_cache(maxsize=1000)
+def get_theme_vocabulary(theme):
+    theme = normalize_theme(theme)
+    local_vocabulary = get_local_theme_vocabulary(theme)
+    if local_vocabulary is not None:
+        return local_vocabulary
+
+    # Otherwise take every English concept that shares an edge with the theme
+    return frozenset(conceptnet.related_terms(theme) | {theme})
+
+# Function to build a small trie holding only a theme's vocabulary from a dictionary (least recently used vocabularies
+# are evicted). The ASGI server resolves vocabularies on its event loop and builds their tries here on a search worker.
+@lru_cache(maxsize=64)
+def build_theme_trie(vocabulary, dictionary):
+    theme_trie = Trie()
+    for word in vocabulary:
+        if word in dictionary.words:
+            theme_trie.insert(word)
+    return theme_trie
+
+# Function to get the trie of a theme's vocabulary from a dictionary
+def get_theme_trie(theme, dictionary):
+    return build_theme_trie(get_theme_vocabulary(theme), dictionary)
+
+# Drop cached theme tries when a dictionary is swapped or evicted, so they don't keep the old dictionary alive
+dictionaries.on_swap.append(lambda name: build_theme_trie.cache_clear())
+
+# Function to find the words on a board that are related to the theme
+def solve_board(grid, min_length, max_length, theme, dictionary, theme_first=False, cancel_token=None, wildcards=None):
+    if theme_first:
+        # Only search for the theme's vocabulary, which is already known to be related to the theme
+        theme_trie = get_theme_trie(normalize_theme(theme), dictionary)
+        return list(word_search(grid, min_length, max_length, theme_trie, cancel_token=cancel_token, wildcards=wildcards))
+
+    # Call the word search function to find valid words
+    found_words = word_search(grid, min_length, max_length, dictionary.trie, cancel_token=cancel_token, wildcards=wildcards)
+
+    # Themes with precomputed bitsets are filtered locally; the others are checked word by word
+    bitset = theme_bitsets.get(dictionary, normalize_theme(theme))
+    if bitset is not None:
+        return bitset.filter(found_words)
+    return filter_words_by_theme(found_words, theme, cancel_token=cancel_token)
+
+# Function to solve a board for /solve, returning the words together with the letters their wildcards took
+def solve_board_result(grid, min_length, max_length, theme, dictionary, theme_first=False, cancel_token=None):
+    wildcards = {}
+    words_found = solve_board(grid, min_length, max_length, theme, dictionary, theme_first, cancel_token, wildcards)
+    return board_result(words_found, wildcards)
+
+# Function to register a request's cancellation token for its session, cancelling the session's previous solve
+def start_session_solve(session_id, cancel_token):
+    if session_id:
+        with active_solves_lock:
+            previous = active_solves.get(session_id)
+            active_solves[session_id] = cancel_token
+        if previous is not None:
+            previous.cancel("superseded by a newer request")
+
+def finish_session_solve(session_id, cancel_token):
+    if session_id:
+        with active_solves_lock:
+            if active_solves.get(session_id) is cancel_token:
+                del active_solves[session_id]
+
+# Function to turn a board into a canonical form shared by all its rotations and reflections, which hold the same words
+def canonical_board(grid):
+    rows = tuple(tuple(cell.strip().upper() for cell in row) for row in grid)
+    flipped = rows[::-1]
+    variants = [rows, flipped, tuple(row[::-1] for row in rows), tuple(row[::-1] for row in flipped)]
+
+    # Square boards also map onto their transposes
+    if len(rows) == len(rows[0]):
+        variants += [tuple(zip(*variant)) for variant in variants]
+    return min(variants)
+
+# Function to build a board's result, listing wildcard letters only for the words that used wildcards
+def board_result(words_found, wildcards):
+    result = {"words": list(words_found)}
+    used = {word: wildcards[word] for word in words_found if word in wildcards}
+    if used:
+        result["wildcards"] = used
+    return result
+
+# Function to solve many boards at once, yielding (index, result) pairs as each board finishes
+def iter_solve_many(boards, min_length=3, max_length=16, theme="", dictionary=None, theme_first=False, max_workers=8):
+    results = {}
+    searches = {}  # search key -> indexes of the boards that share it
+    options_by_index = {}
+
+    for index, board in enumerate(boards):
+        # A bad board only fails its own result, like a missing theme or an unknown dictionary
+        if not isinstance(board, dict):
+            results[index] = {"error": "Board must be an object"}
+            continue
+
+        # Each board can override the batch-wide options
+        board_theme = board.get("theme", theme)
+        if not board_theme:
+            results[index] = {"error": "Theme is required"}
+            continue
+        if not is_safe_theme(board_theme):
+            results[index] = {"error": "Theme can't contain '/' or '..'"}
+            continue
+        try:
+            board_dictionary = dictionaries.get(board.get("dictionary", dictionary))
+        except KeyError:
+            results[index] = {"error": f"Unknown dictionary '{board.get('dictionary', dictionary)}'"}
+            continue
+
+        grid = board.get("grid", [])
+        if not isinstance(grid, list):
+            grid = []
+        grid_2d = grid if grid and isinstance(grid[0], list) else to_grid_2d(grid)
+        error = grid_error(grid_2d)
+        if error:
+            results[index] = {"error": error}
+            continue
+        options = (board.get("min_length", min_length), board.get("max_length", max_length), normalize_theme(board_theme),
+                   board_dictionary, board.get("theme_first", theme_first))
+        options_by_index[index] = options
+
+        # Identical or symmetric boards with the same options are only searched once
+        key = (canonical_board(grid_2d),) + options[:2] + (options[2] if options[4] else None, board_dictionary.name)
+        searches.setdefault(key, (grid_2d, options, []))[2].append(index)
+
+    for index, result in results.items():
+        yield index, result
+
+    # Run the searches across a worker pool sharing the same dictionaries
+    found = {}
+    wildcards = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {}
+        for key, (grid_2d, (board_min, board_max, board_theme, board_dictionary, board_theme_first), indexes) in searches.items():
+            if board_theme_first:
+                try:
+                    words_trie = get_theme_trie(board_theme, board_dictionary)
+                except ConceptNetUnavailable:
+                    for index in indexes:
+                        yield index, {"error": "Theme vocabulary is unavailable, retry without theme_first"}
+                    continue
+            else:
+                words_trie = board_dictionary.trie
+            board_wildcards = {}
+            futures[executor.submit(word_search, grid_2d, board_min, board_max, words_trie, 1, None, board_wildcards)] = (indexes, board_wildcards)
+
+        for future in as_completed(futures):
+            indexes, board_wildcards = futures[future]
+            try:
+                words_found = future.result()
+            except Exception as e:
+                # Only the boards sharing the failed search get an error; the others still get their results
+                logger.exception("Search failed for boards %s", indexes)
+                for index in indexes:
+                    yield index, {"error": f"Search failed: {e}"}
+                continue
+            for index in indexes:
+                found[index] = words_found
+                wildcards[index] = board_wildcards
+
+    # Theme-first boards are already filtered and themes with precomputed bitsets are filtered locally; the others need
+    # their (word, theme) pairs checked
+    pending = {}
+    pairs = {}
+    for index, words_found in found.items():
+        _, _, board_theme, board_dictionary, board_theme_first = options_by_index[index]
+        if board_theme_first or not words_found:
+            yield index, board_result(words_found, wildcards[index])
+            continue
+        bitset = theme_bitsets.get(board_dictionary, board_theme)
+        if bitset is not None:
+            yield index, board_result(bitset.filter(words_found), wildcards[index])
+            continue
+        pending[index] = len(words_found)
+        for word in words_found:
+            pairs.setdefault((word, board_theme), []).append(index)
+
+    # Check each (word, theme) pair once for the whole batch, finishing boards as their last pair comes back
+    related = {}
+    failed = set()
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        futures = {executor.submit(is_word_related_to_theme, word, board_theme): (word, board_theme) for word, board_theme in pairs}
+        for future in as_completed(futures):
+            pair = futures[future]
+            try:
+                related[pair] = future.result()
+            except Exception:
+                logger.exception("Theme check failed for %r", pair)
+                failed.update(pairs[pair])
+            for index in pairs[pair]:
+                pending[index] -= 1
+                if pending[index] == 0:
+                    if index in failed:
+                        yield index, {"error": "Theme check failed"}
+                        continue
+                    board_theme = options_by_index[index][2]
+                    yield index, board_result([word for word in found[index] if related[(word, board_theme)]], wildcards[index])
+
+# Function to solve many boards at once, returning the results in the same order as the boards
+def solve_many(boards, min_length=3, max_length=16, theme="", dictionary=None, theme_first=False, max_workers=8):
+    results = dict(iter_solve_many(boards, min_length, max_length, theme, dictionary, theme_first, max_workers))
+    return [results[index] for index in range(len(boards))]
+
+# Function to pre-populate the theme caches and exercise the search path on a few sample boards
+def warm_up():
+    for board in WARMUP_BOARDS:
+        word_search(to_grid_2d(board), 3, 16)
+
+    for theme in WARMUP_THEMES:
+        try:
+            get_theme_trie(normalize_theme(theme), dictionaries.get())
+        except Exception:
+            # A theme that can't be fetched now is simply fetched again on first use
+            logger.warning("Could not warm up theme %r", theme, exc_info=True)
+
+# Function to load the dictionary and warm up on a background thread, marking the instance ready when done
+def load_in_background():
+    global loading_error
+    try:
+        start_time = time.time()
+        dictionaries.get()
+        warm_up()
+        logger.info("Dictionary loaded and warmed up in %.2f seconds", time.time() - start_time)
+        ready.set()
+    except Exception as e:
+        loading_error = str(e)
+        logger.exception("Failed to load the dictionary")
+
+# Function to start background loading (only once per process)
+def start_background_loading():
+    global loading_thread
+    if loading_thread is None:
+        loading_thread = threading.Thread(target=load_in_background, name="dictionary-loader", daemon=True)
+        loading_thread.start()
+    return loading_thread
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    # The process is up and serving requests
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    # The dictionary is loaded and the caches are warm
+    if ready.is_set():
+        return jsonify({"status": "ready"})
+    if loading_error:
+        return jsonify({"status": "failed", "error": loading_error}), 503
+    return jsonify({"status": "loading"}), 503
+
 @app.route('/solve', methods=['POST'])
 def solve():
+    if not ready.is_set():
+        return jsonify({"error": "Dictionary is still loading"}), 503  # Ask the client to retry once /readyz reports ready
+
     # Get the grid of letters and word length range from the request
     data = request.json
     grid = data.get("grid", [])
@@ -136,24 +705,140 @@ def solve():
     max_length = data.get("max_length", 16)
 
     theme = data.get("theme", "")  # Extract the theme from the frontend request
+    theme_first = data.get("theme_first", False)  # Search only the theme's vocabulary instead of filtering afterwards
+    dictionary_name = data.get("dictionary")  # Which word list to search (the default dictionary if not given)
+    session_id = data.get("session_id")  # A newer request from the same session cancels this one
 
     if not theme:
         return jsonify({"error": "Theme is required"}), 400  # Return an error if the theme is not provided
+    if not is_safe_theme(theme):
+        return jsonify({"error": "Theme can't contain '/' or '..'"}), 400
+
+    try:
+        dictionary = dictionaries.get(dictionary_name)
+    except KeyError:
+        return jsonify({"error": f"Unknown dictionary '{dictionary_name}'"}), 400
 
     # Convert the flat grid (1D array) into a 2D grid (4x4)
-    grid_2d = [grid[i:i+4] for i in range(0, len(grid), 4)]
+    grid_2d = to_grid_2d(grid) if isinstance(grid, list) else []
+    error = grid_error(grid_2d)
+    if error:
+        return jsonify({"error": error}), 400
 
     # Print the grid to the console (for debugging)
     print("Received grid:")
     for row in grid_2d:
         print(row)
 
-    # Call the word search function to find valid words
-    found_words = word_search(grid_2d, min_length, max_length)
-    filtered_words = filter_words_by_theme(found_words, theme)
+    # Stop working on the request if the client goes away or the same session sends a newer one
+    cancel_token = CancellationToken()
+    done = threading.Event()
+    start_session_solve(session_id, cancel_token)
+    watch_for_disconnect(request.environ, cancel_token, done)
+
+    # Identical concurrent requests (same board, lengths, theme and dictionary) share a single solve
+    key = [[[cell.strip().upper() for cell in row] for row in grid_2d], min_length, max_length, normalize_theme(theme), dictionary.name, theme_first]
+    try:
+        while True:
+            try:
+                result = solve_flights.do(key, lambda: solve_board_result(grid_2d, min_length, max_length, theme, dictionary, theme_first, cancel_token), cancel_token)
+                break
+            except SolveCancelled:
+                # A shared solve cancelled by another client is retried; only our own cancellation ends the request
+                if cancel_token.cancelled:
+                    return jsonify({"error": f"Solve was cancelled ({cancel_token.reason})"}), 499
+    except ConceptNetUnavailable:
+        return jsonify({"error": "Theme vocabulary is unavailable, retry without theme_first"}), 503
+    finally:
+        done.set()
+        finish_session_solve(session_id, cancel_token)
+
+    # Return the valid words (and the letters any wildcards took) as a response
+    return jsonify(result)
+
+@app.route('/cancel', methods=['POST'])
+def cancel():
+    # Cancel the solve currently running for a session (e.g. when the user edits the board or resets it)
+    data = request.get_json(force=True, silent=True) or {}
+    with active_solves_lock:
+        cancel_token = active_solves.get(data.get("session_id"))
+    if cancel_token is not None:
+        cancel_token.cancel("cancelled by the client")
+    return jsonify({"cancelled": cancel_token is not None})
+
+@app.route('/solve/batch', methods=['POST'])
+def solve_batch():
+    if not ready.is_set():
+        return jsonify({"error": "Dictionary is still loading"}), 503  # Ask the client to retry once /readyz reports ready
+
+    # Get the boards and the options shared by the whole batch (each board can override them)
+    data = request.json
+    boards = data.get("boards", [])
+    options = dict(
+        min_length=data.get("min_length", 3),
+        max_length=data.get("max_length", 16),
+        theme=data.get("theme", ""),
+        dictionary=data.get("dictionary"),
+        theme_first=data.get("theme_first", False),
+    )
+
+    if not boards:
+        return jsonify({"error": "Boards are required"}), 400
+    if len(boards) > MAX_BATCH_SIZE:
+        return jsonify({"error": f"At most {MAX_BATCH_SIZE} boards can be solved per batch"}), 413
+
+    if data.get("stream", False):
+        # Stream one JSON line per board as soon as it finishes
+        def generate():
+            for index, result in iter_solve_many(boards, **options):
+                yield json.dumps(dict(result, index=index)) + "\n"
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    return jsonify({"results": solve_many(boards, **options)})
+
+@app.route('/dictionaries', methods=['GET'])
+def list_dictionaries():
+    # List the dictionaries that can be requested and the ones currently loaded
+    return jsonify({"default": dictionaries.default, "dictionaries": dictionaries.names(), "loaded": dictionaries.loaded_names()})
+
+@app.route('/dictionaries/<name>/reload', methods=['POST'])
+def reload_dictionary(name):
+    if name not in dictionaries.names():
+        return jsonify({"error": f"Unknown dictionary '{name}'"}), 404
+    # Rebuild in the background; requests keep using the current copy until the new one is swapped in
+    started = dictionaries.reload(name)
+    return jsonify({"dictionary": name, "reloading": True, "already_reloading": not started}), 202
+
+@app.route('/verify', methods=['POST'])
+def verify():
+    # Get the grid of letters and the candidate words to look for
+    data = request.json
+    grid = data.get("grid", [])
+    candidate_words = data.get("words", [])
+    min_length = data.get("min_length", 1)
+    max_length = data.get("max_length", 16)
+
+    if not candidate_words:
+        return jsonify({"error": "Words are required"}), 400  # Return an error if no candidate words are provided
+    if not isinstance(candidate_words, list) or any(not isinstance(word, str) for word in candidate_words):
+        return jsonify({"error": "Words must be a list of strings"}), 400  # e.g. a single string would be checked letter by letter
+
+    # Reject grids that are missing or ragged (e.g. 15 cells) before tracing paths on them
+    grid_2d = to_grid_2d(grid) if isinstance(grid, list) else []
+    error = grid_error(grid_2d)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Only trace the candidate words instead of running a full dictionary search
+    paths = verify_words(grid_2d, candidate_words, min_length, max_length)
 
-    # Return the valid words as a response
-    return jsonify({"words": list(filtered_words)})
+    # Return the matched words along with the cell path of each one
+    return jsonify({"words": list(paths), "paths": {word: [list(cell) for cell in path] for word, path in paths.items()}})
 
 if __name__ == '__main__':
-    app.run(debug=True)
+    # With the debug reloader on, this module also runs in a watcher process that never serves requests, so only the
+    # serving process (the reloader's child) loads the dictionary
+    debug = True
+    if not debug or os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_background_loading()
+    app.run(debug=debug)
@@ -0,0 +1,461 @@
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from collections import OrderedDict, Counter
+import multiprocessing
+import functools
+import asyncio
+import logging
+import json
+import os
+
+from quart import Quart, Response, request, jsonify
+
+import app as solver
+from conceptnet import AsyncConceptNetClient, ConceptNetClient, ConceptNetUnavailable
+from cancellation import CancellationToken, SolveCancelled
+
+# Async serving mode for the same API as app.py, run with an ASGI server (e.g. `hypercorn asgi:app`).
+# Searches run on a bounded pool off the event loop, theme checks run on the loop over one shared connection pool,
+# and requests beyond the configured limits get 429 instead of queueing without bound.
+app = Quart(__name__)
+
+# Searches that run at once on the search thread pool
+SEARCH_THREADS = int(os.environ.get("ASGI_SEARCH_THREADS", str(os.cpu_count() or 4)))
+
+# If set, searches run in this many forked worker processes instead, so they aren't limited by the GIL.
+# Worker processes can't see cancellation tokens, so a cancelled search there runs to the end and its result is dropped.
+SEARCH_PROCESSES = int(os.environ.get("ASGI_SEARCH_PROCESSES", "0"))
+
+# Batches that run at once, each on its own thread with its own pools, so batches can't hold up other requests
+BATCH_THREADS = int(os.environ.get("ASGI_BATCH_THREADS", "2"))
+
+# Searches running or waiting for a worker before /solve answers 429
+MAX_QUEUED_SEARCHES = int(os.environ.get("ASGI_MAX_QUEUED_SEARCHES", "1024"))
+
+# Requests in progress (searching or waiting on ConceptNet) before /solve answers 429
+MAX_SOLVES = int(os.environ.get("ASGI_MAX_SOLVES", "5000"))
+
+# Connections to ConceptNet shared by every request
+CONCEPTNET_CONNECTIONS = int(os.environ.get("ASGI_CONCEPTNET_CONNECTIONS", "100"))
+
+# Seconds clients are told to wait before retrying a 429
+RETRY_AFTER_SECONDS = int(os.environ.get("ASGI_RETRY_AFTER", "1"))
+
+# Number of (word, theme) relatedness answers kept
+RELATED_CACHE_SIZE = 10000
+
+# Number of theme vocabularies kept for theme-first searches
+VOCABULARY_CACHE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+# Raised when a bounded queue is full, answered with 429
+class ServerBusy(Exception):
+    pass
+
+# A bounded count of work in progress. Only touched from the event loop, so it needs no lock.
+class Admission:
+    def __init__(self, name, limit):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+
+    def enter(self, count=1):
+        if self.active + count > self.limit:
+            raise ServerBusy(f"Too many {self.name} in progress, retry shortly")
+        self.active += count
+
+    def leave(self, count=1):
+        self.active -= count
+
+solves = Admission("requests", MAX_SOLVES)
+searches = Admission("searches", MAX_QUEUED_SEARCHES)
+
+# Shared ConceptNet client for the event loop
+conceptnet = AsyncConceptNetClient(max_connections=CONCEPTNET_CONNECTIONS)
+
+# Relatedness answers, and the checks still in flight, by (word, theme); concurrent requests share each check
+related_cache = OrderedDict()
+related_waiters = Counter()
+
+# Theme vocabularies for theme-first searches, and the fetches still in flight, by theme
+theme_vocabularies = OrderedDict()
+
+# Solves in progress by request key, so identical concurrent requests share one solve
+solves_in_flight = {}
+
+search_threads = ThreadPoolExecutor(max_workers=SEARCH_THREADS, thread_name_prefix="search")
+batch_threads = ThreadPoolExecutor(max_workers=BATCH_THREADS, thread_name_prefix="batch")
+search_processes = None
+
+# Function to prepare a search worker process: the parent's ConceptNet client owns threads that don't survive a fork
+def init_search_worker():
+    solver.conceptnet = ConceptNetClient()
+
+# Function to get the search process pool, forked on first use so the workers share the parent's loaded dictionaries
+def get_search_processes():
+    global search_processes
+    if search_processes is None:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        search_processes = ProcessPoolExecutor(SEARCH_PROCESSES, mp_context=context, initializer=init_search_worker)
+    return search_processes
+
+# Function to search one board in a search worker, returning the words and the letters their wildcards took.
+# Theme-first searches get the theme's vocabulary, already resolved on the event loop, and only search its trie.
+def search_board(grid, min_length, max_length, dictionary_name, vocabulary=None, cancel_token=None):
+    dictionary = solver.dictionaries.get(dictionary_name)
+    words_trie = solver.build_theme_trie(vocabulary, dictionary) if vocabulary is not None else dictionary.trie
+    wildcards = {}
+    words_found = solver.word_search(grid, min_length, max_length, words_trie, 1, cancel_token, wildcards)
+    return list(words_found), wildcards
+
+# Function to run a board's search off the event loop, refusing it if too many searches are already waiting
+async def run_search(grid, min_length, max_length, dictionary, vocabulary, cancel_token):
+    searches.enter()
+    try:
+        loop = asyncio.get_running_loop()
+        if SEARCH_PROCESSES > 0:
+            return await loop.run_in_executor(get_search_processes(), search_board, grid, min_length, max_length, dictionary.name, vocabulary)
+        return await loop.run_in_executor(search_threads, search_board, grid, min_length, max_length, dictionary.name, vocabulary, cancel_token)
+    finally:
+        searches.leave()
+
+# Function to drop a failed or cancelled fetch from its cache, so it is retried on next use
+def forget_failed(cache, key, future):
+    if (future.cancelled() or future.exception() is not None) and cache.get(key) is future:
+        del cache[key]
+
+# Function to get a cached future for a key, starting make() if there isn't one, and keeping at most `size` entries
+def cached_future(cache, key, make, size):
+    future = cache.get(key)
+    if future is None:
+        future = asyncio.ensure_future(make())
+        future.add_done_callback(lambda future: forget_failed(cache, key, future))
+        cache[key] = future
+        while len(cache) > size:
+            cache.popitem(last=False)
+    else:
+        cache.move_to_end(key)
+    return future
+
+async def fetch_theme_vocabulary(theme):
+    return frozenset(await conceptnet.related_terms(theme) | {theme})
+
+# Function to resolve the words related to a theme on the event loop, from a local vocabulary file or ConceptNet,
+# sharing the fetch with concurrent requests (see app.get_theme_vocabulary)
+async def get_theme_vocabulary(theme):
+    theme = solver.normalize_theme(theme)
+    local_vocabulary = solver.get_local_theme_vocabulary(theme)
+    if local_vocabulary is not None:
+        return local_vocabulary
+    return await asyncio.shield(cached_future(theme_vocabularies, theme, lambda: fetch_theme_vocabulary(theme), VOCABULARY_CACHE_SIZE))
+
+# Function to check if a word is related to a theme with ConceptNet, sharing the check with concurrent requests.
+# Failures aren't cached, so they are retried once ConceptNet recovers.
+async def is_word_related_to_theme_conceptnet(word, theme):
+    key = (word, theme)
+    future = cached_future(related_cache, key, lambda: conceptnet.is_related(word, theme), RELATED_CACHE_SIZE)
+
+    # A request that goes away doesn't cancel a check other requests are waiting on, but the last one to go does,
+    # so a check still waiting for a connection is never sent
+    related_waiters[key] += 1
+    try:
+        return await asyncio.shield(future)
+    finally:
+        related_waiters[key] -= 1
+        if not related_waiters[key]:
+            del related_waiters[key]
+            future.cancel()
+
+# Function to check if a word is related to a theme, falling back to the local vocabulary while ConceptNet is unavailable
+async def is_word_related_to_theme(word, theme):
+    try:
+        return await is_word_related_to_theme_conceptnet(word, theme)
+    except ConceptNetUnavailable:
+        local_vocabulary = solver.get_local_theme_vocabulary(theme)
+        return local_vocabulary is not None and word in local_vocabulary
+
+# Function to filter words by theme on the event loop, using the precomputed bitset if the theme has one
+async def filter_words_by_theme(words_list, theme, dictionary, cancel_token):
+    bitset = solver.theme_bitsets.get(dictionary, solver.normalize_theme(theme))
+    if bitset is not None:
+        return bitset.filter(words_list)
+
+    checks = asyncio.ensure_future(asyncio.gather(*(is_word_related_to_theme(word, theme) for word in words_list)))
+    try:
+        while not checks.done():
+            # Wake up regularly so a cancelled request stops waiting on slow upstream calls
+            await asyncio.wait({checks}, timeout=0.1)
+            if cancel_token.cancelled:
+                raise SolveCancelled(cancel_token.reason)
+        return [word for word, related in zip(words_list, checks.result()) if related]
+    finally:
+        if not checks.done():
+            checks.cancel()
+            checks.add_done_callback(lambda checks: checks.cancelled() or checks.exception())
+
+async def solve_board_result(grid, min_length, max_length, theme, dictionary, theme_first, cancel_token):
+    vocabulary = await get_theme_vocabulary(theme) if theme_first else None
+    words_found, wildcards = await run_search(grid, min_length, max_length, dictionary, vocabulary, cancel_token)
+    if not theme_first:
+        words_found = await filter_words_by_theme(words_found, theme, dictionary, cancel_token)
+    return solver.board_result(words_found, wildcards)
+
+def finish_in_flight(key, future):
+    del solves_in_flight[key]
+    if not future.cancelled():
+        future.exception()  # Callers may all have gone away, so mark a failure as seen here
+
+# Function to run make() once for all concurrent callers with the same key
+async def coalesce(key, make):
+    future = solves_in_flight.get(key)
+    if future is None:
+        future = asyncio.ensure_future(make())
+        future.add_done_callback(lambda future: finish_in_flight(key, future))
+        solves_in_flight[key] = future
+    return await asyncio.shield(future)
+
+def busy(error):
+    return jsonify({"error": str(error)}), 429, {"Retry-After": str(RETRY_AFTER_SECONDS)}
+
+# Function to get a dictionary, loading it off the event loop only if it isn't loaded yet
+async def get_dictionary(name):
+    dictionary = solver.dictionaries.get_loaded(name)
+    if dictionary is None:
+        dictionary = await asyncio.to_thread(solver.dictionaries.get, name)
+    return dictionary
+
+# Largest batch that can ever be admitted: each board counts as one queued search
+def max_batch_size():
+    return min(solver.MAX_BATCH_SIZE, searches.limit)
+
+# Function to admit a batch as one request and as one queued search per board, returning a function that releases it
+def admit_batch(boards):
+    solves.enter()
+    try:
+        searches.enter(len(boards))
+    except ServerBusy:
+        solves.leave()
+        raise
+
+    def release():
+        solves.leave()
+        searches.leave(len(boards))
+    return release
+
+# Function to release a batch once its thread finishes, even if the client has gone away by then
+def finish_batch(release, future):
+    release()
+    if not future.cancelled():
+        future.exception()  # The handler may have gone away, so mark a failure as seen here
+
+@app.after_request
+async def allow_cross_origin(response):
+    # Allow cross-origin requests, like flask_cors does for the Flask app
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    return response
+
+@app.before_serving
+async def check_search_processes():
+    # Daemonic processes can't start children, and some servers run the app in daemonic worker processes
+    if SEARCH_PROCESSES > 0 and multiprocessing.current_process().daemon:
+        raise RuntimeError("ASGI_SEARCH_PROCESSES needs the app to run in the server's main process (e.g. hypercorn --workers 0)")
+
+@app.before_serving
+async def start_loading():
+    # Load the default dictionary and warm up in the background, as app.py does when it is run as a server
+    solver.start_background_loading()
+
+@app.after_serving
+async def shut_down():
+    await conceptnet.close()
+    search_threads.shutdown(wait=False, cancel_futures=True)
+    batch_threads.shutdown(wait=False, cancel_futures=True)
+    if search_processes is not None:
+        search_processes.shutdown(wait=False, cancel_futures=True)
+
+@app.route('/healthz', methods=['GET'])
+async def healthz():
+    return jsonify({"status": "ok"})
+
+@app.route('/readyz', methods=['GET'])
+async def readyz():
+    if solver.ready.is_set():
+        return jsonify({"status": "ready"})
+    if solver.loading_error:
+        return jsonify({"status": "failed", "error": solver.loading_error}), 503
+    return jsonify({"status": "loading"}), 503
+
+@app.route('/solve', methods=['POST'])
+async def solve():
+    if not solver.ready.is_set():
+        return jsonify({"error": "Dictionary is still loading"}), 503
+
+    try:
+        solves.enter()
+    except ServerBusy as e:
+        return busy(e)
+    try:
+        return await solve_request(await request.get_json())
+    finally:
+        solves.leave()
+
+async def solve_request(data):
+    grid = data.get("grid", [])
+    min_length = data.get("min_length", 3)
+    max_length = data.get("max_length", 16)
+    theme = data.get("theme", "")
+    theme_first = data.get("theme_first", False)
+    dictionary_name = data.get("dictionary")
+    session_id = data.get("session_id")
+
+    if not theme:
+        return jsonify({"error": "Theme is required"}), 400
+    if not solver.is_safe_theme(theme):
+        return jsonify({"error": "Theme can't contain '/' or '..'"}), 400
+
+    try:
+        dictionary = await get_dictionary(dictionary_name)
+    except KeyError:
+        return jsonify({"error": f"Unknown dictionary '{dictionary_name}'"}), 400
+
+    grid_2d = solver.to_grid_2d(grid) if isinstance(grid, list) else []
+    error = solver.grid_error(grid_2d)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Stop working on the request if the client goes away or the same session sends a newer one
+    cancel_token = CancellationToken()
+    solver.start_session_solve(session_id, cancel_token)
+
+    # Identical concurrent requests (same board, lengths, theme and dictionary) share a single solve
+    key = json.dumps([[[cell.strip().upper() for cell in row] for row in grid_2d], min_length, max_length,
+                      solver.normalize_theme(theme), dictionary.name, theme_first], sort_keys=True)
+    try:
+        while True:
+            try:
+                result = await coalesce(key, lambda: solve_board_result(grid_2d, min_length, max_length, theme, dictionary, theme_first, cancel_token))
+                break
+            except SolveCancelled:
+                # A shared solve cancelled by another client is retried; only our own cancellation ends the request
+                if cancel_token.cancelled:
+                    return jsonify({"error": f"Solve was cancelled ({cancel_token.reason})"}), 499
+    except asyncio.CancelledError:
+        # The server cancels the handler when the client disconnects
+        cancel_token.cancel("client disconnected")
+        raise
+    except ServerBusy as e:
+        return busy(e)
+    except ConceptNetUnavailable:
+        return jsonify({"error": "Theme vocabulary is unavailable, retry without theme_first"}), 503
+    finally:
+        solver.finish_session_solve(session_id, cancel_token)
+
+    return jsonify(result)
+
+@app.route('/cancel', methods=['POST'])
+async def cancel():
+    data = await request.get_json(force=True, silent=True) or {}
+    with solver.active_solves_lock:
+        cancel_token = solver.active_solves.get(data.get("session_id"))
+    if cancel_token is not None:
+        cancel_token.cancel("cancelled by the client")
+    return jsonify({"cancelled": cancel_token is not None})
+
+# Batches do their own pooling of searches and theme checks, so they run as a whole on a batch thread. They are admitted
+# like other solves, so a busy server answers 429 instead of queueing batches without bound.
+@app.route('/solve/batch', methods=['POST'])
+async def solve_batch():
+    if not solver.ready.is_set():
+        return jsonify({"error": "Dictionary is still loading"}), 503
+
+    data = await request.get_json()
+    boards = data.get("boards", [])
+    options = dict(
+        min_length=data.get("min_length", 3),
+        max_length=data.get("max_length", 16),
+        theme=data.get("theme", ""),
+        dictionary=data.get("dictionary"),
+        theme_first=data.get("theme_first", False),
+    )
+
+    if not boards:
+        return jsonify({"error": "Boards are required"}), 400
+    if len(boards) > max_batch_size():
+        return jsonify({"error": f"At most {max_batch_size()} boards can be solved per batch"}), 413
+
+    try:
+        release = admit_batch(boards)
+    except ServerBusy as e:
+        return busy(e)
+
+    if data.get("stream", False):
+        # Stream one JSON line per board as soon as it finishes, holding the batch's admission until the stream ends
+        results = solver.iter_solve_many(boards, **options)
+
+        async def generate():
+            try:
+                while True:
+                    item = await asyncio.get_running_loop().run_in_executor(batch_threads, next, results, None)
+                    if item is None:
+                        return
+                    index, result = item
+                    yield json.dumps(dict(result, index=index)) + "\n"
+            finally:
+                release()
+
+        # Start the stream here, so it is closed (and the admission released) even if the response is never sent
+        lines = generate()
+        first_line = await lines.__anext__()
+
+        async def stream():
+            yield first_line
+            async for line in lines:
+                yield line
+        return Response(stream(), mimetype="application/x-ndjson")
+
+    future = asyncio.get_running_loop().run_in_executor(batch_threads, functools.partial(solver.solve_many, boards, **options))
+    future.add_done_callback(lambda future: finish_batch(release, future))
+    return jsonify({"results": await asyncio.shield(future)})
+
+@app.route('/dictionaries', methods=['GET'])
+async def list_dictionaries():
+    dictionaries = solver.dictionaries
+    return jsonify({"default": dictionaries.default, "dictionaries": dictionaries.names(), "loaded": dictionaries.loaded_names()})
+
+@app.route('/dictionaries/<name>/reload', methods=['POST'])
+async def reload_dictionary(name):
+    if name not in solver.dictionaries.names():
+        return jsonify({"error": f"Unknown dictionary '{name}'"}), 404
+    started = solver.dictionaries.reload(name)
+    return jsonify({"dictionary": name, "reloading": True, "already_reloading": not started}), 202
+
+@app.route('/verify', methods=['POST'])
+async def verify():
+    data = await request.get_json()
+    candidate_words = data.get("words", [])
+    if not candidate_words:
+        return jsonify({"error": "Words are required"}), 400
+    if not isinstance(candidate_words, list) or any(not isinstance(word, str) for word in candidate_words):
+        return jsonify({"error": "Words must be a list of strings"}), 400
+
+    grid = data.get("grid", [])
+    grid_2d = solver.to_grid_2d(grid) if isinstance(grid, list) else []
+    error = solver.grid_error(grid_2d)
+    if error:
+        return jsonify({"error": error}), 400
+
+    # Verifying searches the board, so it runs on the search pool and is admitted like a search
+    try:
+        searches.enter()
+    except ServerBusy as e:
+        return busy(e)
+    try:
+        paths = await asyncio.get_running_loop().run_in_executor(search_threads, solver.verify_words, grid_2d, candidate_words, data.get("min_length", 1), data.get("max_length", 16))
+    finally:
+        searches.leave()
+    return jsonify({"words": list(paths), "paths": {word: [list(cell) for cell in path] for word, path in paths.items()}})
+
+if __name__ == '__main__':
+    app.run(debug=True)
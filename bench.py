@@ -0,0 +1,122 @@
+import argparse
+import random
+import time
+
+import app
+from loadtest import LETTER_WEIGHTS
+
+# Function to generate seeded random 4x4 boards with English letter frequencies
+def random_boards(count, seed=0):
+    rng = random.Random(seed)
+    letters, weights = zip(*LETTER_WEIGHTS.items())
+    return [app.to_grid_2d(rng.choices(letters, weights, k=16)) for _ in range(count)]
+
+# Function to generate seeded random 4x4 boards using only the most common `distinct` letters, so words are re-found
+# from many paths
+def dense_boards(count, distinct, seed=0):
+    rng = random.Random(seed)
+    letters = sorted(LETTER_WEIGHTS, key=LETTER_WEIGHTS.get, reverse=True)[:distinct]
+    return [app.to_grid_2d(rng.choices(letters, k=16)) for _ in range(count)]
+
+# Function to time a search function over a set of boards, returning the mean seconds per board
+def time_boards(search, boards, repeats=3):
+    best = None
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        for grid in boards:
+            search(grid)
+        elapsed = (time.perf_counter() - start_time) / len(boards)
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# Function to compare normal boards with the same boards holding one and two wildcard tiles.
+# Wildcards make many more words reachable, so the cost per word found is reported alongside the time per board.
+def benchmark_wildcards(dictionary, boards, min_length, max_length):
+    def search(grid):
+        return app.word_search(grid, min_length, max_length, dictionary.trie, 1)
+
+    def words_per_board(boards):
+        return sum(len(search(grid)) for grid in boards) / len(boards)
+
+    def with_wildcards(count):
+        wildcard_boards = []
+        for grid in boards:
+            grid = [row[:] for row in grid]
+            for i, j in [(1, 1), (2, 2)][:count]:
+                grid[i][j] = app.WILDCARD
+            wildcard_boards.append(grid)
+        return wildcard_boards
+
+    print("Wildcards")
+    baseline = None
+    for count in (0, 1, 2):
+        count_boards = with_wildcards(count)
+        elapsed = time_boards(search, count_boards)
+        per_word = elapsed / max(1, words_per_board(count_boards))
+        baseline = baseline or (elapsed, per_word)
+        print(f"  {count} wildcards: {elapsed * 1000:8.2f} ms/board ({elapsed / baseline[0]:6.2f}x), "
+              f"{per_word * 1e6:6.1f} us/word found ({per_word / baseline[1]:.2f}x)")
+
+# Function to time the forward and bidirectional engines over [min length, max length] for a range of min lengths,
+# to find the crossover above which searching from both ends pays off (BIDIRECTIONAL_MIN_LENGTH)
+def benchmark_engines(dictionary, boards, max_length):
+    print(f"Engines (words up to {max_length} letters)")
+
+    # Longest minimum first, so each minimum gets its own half-word index rather than reusing a larger one
+    timings = {}
+    for min_length in range(max_length, 2, -1):
+        dictionary.trie.halves(min_length)  # Build the index up front so it isn't timed
+        timings[min_length] = {}
+        for engine in ("forward", "bidirectional"):
+            timings[min_length][engine] = time_boards(lambda grid: app.word_search(grid, min_length, max_length, dictionary.trie, 1, engine=engine), boards)
+
+    crossover = None
+    for min_length in range(3, max_length + 1):
+        faster = min(timings[min_length], key=timings[min_length].get)
+        if crossover is None and faster == "bidirectional":
+            crossover = min_length
+        print(f"  {min_length:2d}-{max_length}: forward {timings[min_length]['forward'] * 1000:8.2f} ms/board, "
+              f"bidirectional {timings[min_length]['bidirectional'] * 1000:8.2f} ms/board ({faster})")
+    print(f"  crossover: {crossover} (BIDIRECTIONAL_MIN_LENGTH is {app.BIDIRECTIONAL_MIN_LENGTH})")
+
+# Function to compare the search with and without skipping exhausted trie subtrees on boards of fewer and fewer
+# distinct letters, reporting the nodes expanded as well as the time (whether pruning pays off, PRUNE_EXHAUSTED)
+def benchmark_pruning(dictionary, boards, min_length, max_length, seed=0):
+    def expanded_per_board(boards, prune):
+        expanded = 0
+        for grid in boards:
+            stats = {}
+            app.word_search(grid, min_length, max_length, dictionary.trie, 1, prune_exhausted=prune, stats=stats)
+            expanded += stats["expanded"]
+        return expanded / len(boards)
+
+    print("Pruning exhausted subtrees")
+    for distinct in list(range(2, 9)) + [None]:
+        label = f"{distinct} letters" if distinct else "random"
+        distinct_boards = dense_boards(len(boards), distinct, seed) if distinct else boards
+        timings, expanded = {}, {}
+        for prune in (False, True):
+            timings[prune] = time_boards(lambda grid: app.word_search(grid, min_length, max_length, dictionary.trie, 1, prune_exhausted=prune), distinct_boards)
+            expanded[prune] = expanded_per_board(distinct_boards, prune)
+        print(f"  {label:>10}: {expanded[False]:8.0f} -> {expanded[True]:8.0f} nodes/board "
+              f"({1 - expanded[True] / expanded[False]:6.1%} fewer), "
+              f"{timings[False] * 1000:8.2f} -> {timings[True] * 1000:8.2f} ms/board")
+    print(f"  (PRUNE_EXHAUSTED is {app.PRUNE_EXHAUSTED})")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the board search.")
+    parser.add_argument("--boards", type=int, default=50, help="number of random boards to time")
+    parser.add_argument("--min-length", type=int, default=3)
+    parser.add_argument("--max-length", type=int, default=16)
+    parser.add_argument("--dictionary", default=None, help="dictionary to search (the default dictionary if not given)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    dictionary = app.dictionaries.get(args.dictionary)
+    boards = random_boards(args.boards, args.seed)
+    benchmark_wildcards(dictionary, boards, args.min_length, args.max_length)
+    benchmark_engines(dictionary, boards, args.max_length)
+    benchmark_pruning(dictionary, boards, args.min_length, args.max_length, args.seed)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import argparse
+import time
+import sys
+
+import app
+from conceptnet import ConceptNetUnavailable
+from theme_bitsets import bitset_size, read_bitsets, write_bitsets
+
+# Function to build a theme's bitset from the theme's edge list. A word is related to the theme (the check /solve makes
+# for each found word) exactly when it shares an edge with the theme, so listing the theme's edges, a page at a time,
+# and keeping the dictionary words among them takes a few calls instead of one per dictionary word
+def build_bitset(dictionary, theme):
+    bits = bytearray(bitset_size(dictionary))
+    for word in app.conceptnet.related_terms(theme):
+        word_id = dictionary.word_id(word)
+        if word_id is not None:
+            bits[word_id >> 3] |= 1 << (word_id & 7)
+    return bytes(bits)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute which dictionary words are related to the most common themes.")
+    parser.add_argument("--themes", nargs="+", default=app.WARMUP_THEMES, help="themes to precompute (the warm-up themes if not given)")
+    parser.add_argument("--dictionary", default=None, help="dictionary to precompute for (the default dictionary if not given)")
+    parser.add_argument("--output-dir", default=app.THEME_BITSET_DIR)
+    args = parser.parse_args(argv)
+
+    dictionary = app.dictionaries.get(args.dictionary)
+    print(f"Dictionary {dictionary.name!r}: {len(dictionary.sorted_words)} words", file=sys.stderr)
+
+    # Keep the bitsets of themes that aren't being rebuilt, as long as they were built for the same word list
+    bitsets = read_bitsets(args.output_dir, dictionary)
+    failed = []
+    for theme in dict.fromkeys(app.normalize_theme(theme) for theme in args.themes):
+        start_time = time.time()
+        try:
+            bitsets[theme] = build_bitset(dictionary, theme)
+        except ConceptNetUnavailable as e:
+            # A theme is only stored once its whole edge list has been read; until then requests keep checking it live
+            print(f"{theme}: failed ({e})", file=sys.stderr)
+            failed.append(theme)
+            continue
+        related = sum(bin(byte).count("1") for byte in bitsets[theme])
+        print(f"{theme}: {related} related words in {time.time() - start_time:.1f} seconds", file=sys.stderr)
+
+    write_bitsets(args.output_dir, dictionary, bitsets)
+    print(f"Wrote {len(bitsets)} theme bitsets for {dictionary.name!r} to {args.output_dir}", file=sys.stderr)
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,50 @@
+import threading
+import logging
+import select
+import socket
+
+logger = logging.getLogger(__name__)
+
+# Raised by long-running work once its cancellation token has been tripped
+class SolveCancelled(Exception):
+    pass
+
+# A token that long-running work polls so it can stop early once nobody is waiting for its result
+class CancellationToken:
+    def __init__(self):
+        self._event = threading.Event()
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason="cancelled"):
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+# Function to check whether the client has closed its connection (readable with nothing left to read)
+def client_disconnected(sock):
+    try:
+        readable, _, _ = select.select([sock], [], [], 0)
+        return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b""
+    except (OSError, ValueError):
+        return True
+
+# Function to trip the token if the client behind a WSGI request disconnects, until `done` is set.
+# Only servers that expose the client socket in the environ (werkzeug and gunicorn do) can be watched.
+def watch_for_disconnect(environ, token, done, interval=0.25):
+    sock = environ.get("werkzeug.socket") or environ.get("gunicorn.socket")
+    if sock is None:
+        return None
+
+    def watch():
+        while not done.wait(interval):
+            if client_disconnected(sock):
+                token.cancel("client disconnected")
+                return
+
+    thread = threading.Thread(target=watch, name="disconnect-watcher", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,367 @@
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+import threading
+import asyncio
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Base URL of the ConceptNet API (point this at a local stand-in for testing)
+CONCEPTNET_URL = os.environ.get("CONCEPTNET_URL", "http://api.conceptnet.io")
+
+# Raised when ConceptNet can't be used right now (circuit open, timed out or failing), so callers can fall back
+class ConceptNetUnavailable(Exception):
+    pass
+
+# Keeps a window of recent latencies so hedging can be triggered at a latency percentile
+class LatencyTracker:
+    def __init__(self, window=200):
+        self.samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency):
+        with self._lock:
+            self.samples.append(latency)
+
+    def percentile(self, p):
+        with self._lock:
+            samples = sorted(self.samples)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+# Circuit breaker: trips after too many errors or slow calls, then lets single probes through (half-open) to recover
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window=50, min_calls=10, error_rate=0.5, slow_rate=0.5, slow_call=2.0, reset_timeout=30.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_call = slow_call
+        self.reset_timeout = reset_timeout
+
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)  # (failed, slow) for each recent call
+        self.opened_at = 0.0
+        self.probing = False
+        self._lock = threading.Lock()
+
+    # Function to decide whether a call may go upstream right now
+    def allow(self):
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record(self, failed, latency):
+        slow = latency >= self.slow_call
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probing = False
+                if failed or slow:
+                    self._trip()
+                else:
+                    logger.info("ConceptNet circuit closed")
+                    self.state = self.CLOSED
+                    self.outcomes.clear()
+                return
+
+            self.outcomes.append((failed, slow))
+            if self.state == self.CLOSED and len(self.outcomes) >= self.min_calls:
+                failures = sum(1 for failed, _ in self.outcomes if failed)
+                slow_calls = sum(1 for _, slow in self.outcomes if slow)
+                if failures >= self.error_rate * len(self.outcomes) or slow_calls >= self.slow_rate * len(self.outcomes):
+                    self._trip()
+
+    # Function to give up a half-open probe that ended without an outcome (e.g. a cancelled call), so that the next call
+    # can probe instead of the circuit staying half-open with nothing let through
+    def release_probe(self):
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.probing = False
+
+    def _trip(self):
+        logger.warning("ConceptNet circuit opened")
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.outcomes.clear()
+
+# Function to list the English concepts in a ConceptNet query response that share an edge with a concept
+def related_concepts(response, concept):
+    related = set()
+    for edge in response.get('edges', []):
+        for end in (edge.get('start', {}), edge.get('end', {})):
+            parts = end.get('@id', '').split('/')
+            if len(parts) > 3 and parts[2] == 'en' and parts[3] != concept:
+                related.add(parts[3])
+    return related
+
+# Function to get the path of the next page of a paginated ConceptNet response (e.g. "/query?node=...&offset=1000"),
+# or None on the last page
+def next_page(response):
+    return response.get('view', {}).get('nextPage') or None
+
+# State shared by the blocking and asyncio clients: hedging settings, recent latencies, counters and the circuit breaker
+class BaseConceptNetClient:
+    def __init__(self, base_url=CONCEPTNET_URL, timeout=5.0, hedge_percentile=95, hedge_min_delay=0.05,
+                 hedge_min_samples=20, breaker=None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latencies = LatencyTracker()
+        self.counters = {"requests": 0, "hedged": 0, "failures": 0, "rejected": 0}
+        self._session = None
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, circuit=self.breaker.state)
+
+    # Delay after which a duplicate request is sent, or None until there are enough samples to pick a percentile
+    def _hedge_delay(self):
+        if len(self.latencies.samples) < self.hedge_min_samples:
+            return None
+        return max(self.hedge_min_delay, self.latencies.percentile(self.hedge_percentile))
+
+    def _succeeded(self, start_time):
+        latency = time.monotonic() - start_time
+        self.latencies.record(latency)
+        self.breaker.record(False, latency)
+
+    def _failed(self, start_time, error):
+        self._count("failures")
+        self.breaker.record(True, time.monotonic() - start_time)
+        return ConceptNetUnavailable(str(error))
+
+# ConceptNet client that hedges slow requests with a duplicate and stops calling upstream while the circuit is open
+class ConceptNetClient(BaseConceptNetClient):
+    def __init__(self, base_url=CONCEPTNET_URL, timeout=5.0, hedge_percentile=95, hedge_min_delay=0.05,
+                 hedge_min_samples=20, max_workers=20, breaker=None):
+        super().__init__(base_url, timeout, hedge_percentile, hedge_min_delay, hedge_min_samples, breaker)
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="conceptnet")
+        self._queued = 0  # Attempts submitted to the executor that haven't started yet
+        self._running = 0  # Attempts currently running on the executor
+
+    # requests is imported here so that importing the app stays fast
+    def _get_session(self):
+        if self._session is None:
+            import requests
+            with self._lock:
+                if self._session is None:
+                    session = requests.Session()
+                    adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.max_workers)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    def _fetch(self, path, params):
+        self._count("requests")
+        response = self._get_session().get(f"{self.base_url}{path}", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    # Function to make one attempt on a worker, noting when it starts: when every worker is busy, attempts wait in the
+    # executor's queue, and that wait is local rather than upstream latency
+    def _attempt(self, path, params, started):
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        started.time = time.monotonic()
+        started.set()
+        try:
+            return self._fetch(path, params)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _submit(self, path, params, started):
+        with self._lock:
+            self._queued += 1
+        return self._executor.submit(self._attempt, path, params, started)
+
+    # Function to drop an attempt that hasn't started yet (it no longer counts as queued)
+    def _cancel(self, future):
+        if future.cancel():
+            with self._lock:
+                self._queued -= 1
+
+    # Function to check whether a hedge would start right away instead of queueing behind other callers' attempts
+    def _has_free_worker(self):
+        with self._lock:
+            return self._running + self._queued < self.max_workers
+
+    # Function to GET a ConceptNet path, hedging slow calls and recording the outcome with the circuit breaker.
+    # Latency, the hedge delay and the timeout all count from when the first attempt starts on a worker.
+    def get_json(self, path, params=None):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise ConceptNetUnavailable("circuit open")
+
+        started = threading.Event()
+        pending = {self._submit(path, params, started)}
+        started.wait()
+        start_time = started.time
+
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is not None:
+            done, _ = wait(pending, timeout=max(0.0, start_time + hedge_delay - time.monotonic()))
+            if not done and self._has_free_worker():
+                # The first request is slower than usual, so race it against a duplicate
+                self._count("hedged")
+                pending.add(self._submit(path, params, threading.Event()))
+
+        # Take the first successful response; only give up once every attempt has failed
+        error = None
+        deadline = start_time + self.timeout
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=FIRST_COMPLETED)
+                if not done:
+                    error = TimeoutError(f"ConceptNet did not answer within {self.timeout} seconds")
+                    break
+                for future in done:
+                    if future.exception() is None:
+                        self._succeeded(start_time)
+                        return future.result()
+                    error = future.exception()
+        finally:
+            # Drop a hedge that is still waiting for a worker
+            for future in pending:
+                self._cancel(future)
+
+        raise self._failed(start_time, error) from error
+
+    # Function to check if two concepts share at least one edge
+    def is_related(self, word, theme):
+        response = self.get_json("/query", {"node": f"/c/en/{word}", "other": f"/c/en/{theme}"})
+        return len(response.get('edges', [])) > 0
+
+    # Function to list the English concepts that share an edge with a concept, following every page of its edges
+    def related_terms(self, concept, limit=1000):
+        related = set()
+        response = self.get_json("/query", {"node": f"/c/en/{concept}", "limit": limit})
+        while True:
+            related |= related_concepts(response, concept)
+            page = next_page(response)
+            if page is None:
+                return related
+            response = self.get_json(page)
+
+# asyncio counterpart of ConceptNetClient for the ASGI server: every request on the event loop shares one aiohttp
+# connection pool, and requests are hedged and guarded by a circuit breaker in the same way.
+# Must be used from a single event loop (aiohttp is imported here so that the Flask app doesn't need it).
+class AsyncConceptNetClient(BaseConceptNetClient):
+    def __init__(self, base_url=CONCEPTNET_URL, timeout=5.0, hedge_percentile=95, hedge_min_delay=0.05,
+                 hedge_min_samples=20, max_connections=100, breaker=None):
+        super().__init__(base_url, timeout, hedge_percentile, hedge_min_delay, hedge_min_samples, breaker)
+        self.max_connections = max_connections
+        self._connections = None  # Semaphore of free connections, created on the event loop
+
+    def _get_session(self):
+        if self._session is None:
+            import aiohttp
+            self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.max_connections))
+            self._connections = asyncio.Semaphore(self.max_connections)
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _fetch(self, path, params):
+        self._count("requests")
+        async with self._get_session().get(f"{self.base_url}{path}", params=params) as response:
+            response.raise_for_status()
+            return await response.json(content_type=None)
+
+    # Function to make one attempt once a connection is free, noting when it starts: waiting for a connection behind
+    # other requests is local rather than upstream latency (as with ConceptNetClient's workers)
+    async def _attempt(self, path, params, started):
+        self._get_session()
+        async with self._connections:
+            started.time = time.monotonic()
+            started.set()
+            return await self._fetch(path, params)
+
+    # Function to GET a ConceptNet path, hedging slow calls and recording the outcome with the circuit breaker.
+    # Latency, the hedge delay and the timeout all count from when the first attempt gets a connection.
+    async def get_json(self, path, params=None):
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise ConceptNetUnavailable("circuit open")
+        # Nothing else runs on the loop in between, so a half-open circuit here means this call is the probe
+        probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+        started = asyncio.Event()
+        pending = {asyncio.ensure_future(self._attempt(path, params, started))}
+        try:
+            await started.wait()
+            start_time = started.time
+
+            hedge_delay = self._hedge_delay()
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=max(0.0, start_time + hedge_delay - time.monotonic()))
+                if not done and not self._connections.locked():
+                    # The first request is slower than usual, so race it against a duplicate
+                    self._count("hedged")
+                    pending.add(asyncio.ensure_future(self._attempt(path, params, asyncio.Event())))
+
+            # Take the first successful response; only give up once every attempt has failed
+            error = None
+            deadline = start_time + self.timeout
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=max(0.0, deadline - time.monotonic()), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    error = TimeoutError(f"ConceptNet did not answer within {self.timeout} seconds")
+                    break
+                for task in done:
+                    if task.exception() is None:
+                        self._succeeded(start_time)
+                        return task.result()
+                    error = task.exception()
+        except asyncio.CancelledError:
+            # The caller went away before the call had an outcome; a probe must not hold the circuit half-open
+            if probe:
+                self.breaker.release_probe()
+            raise
+        finally:
+            # Close the losing or timed out attempts instead of leaving them running on the loop
+            for task in pending:
+                task.cancel()
+
+        raise self._failed(start_time, error) from error
+
+    async def is_related(self, word, theme):
+        response = await self.get_json("/query", {"node": f"/c/en/{word}", "other": f"/c/en/{theme}"})
+        return len(response.get('edges', [])) > 0
+
+    async def related_terms(self, concept, limit=1000):
+        related = set()
+        response = await self.get_json("/query", {"node": f"/c/en/{concept}", "limit": limit})
+        while True:
+            related |= related_concepts(response, concept)
+            page = next_page(response)
+            if page is None:
+                return related
+            response = await self.get_json(page)
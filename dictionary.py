@@ -0,0 +1,276 @@
+from collections import OrderedDict, defaultdict
+from bisect import bisect_left
+import threading
+import hashlib
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Name of the built-in dictionary backed by NLTK's words corpus
+NLTK_DICTIONARY = "nltk"
+
+# Most half-word indexes kept per trie for the bidirectional search (each one can take as much memory as the trie)
+MAX_HALF_INDEXES = 2
+
+# Optimized Trie implementation for storing valid words
+class TrieNode:
+    def __init__(self):
+        self.children = {}
+        self.is_end_of_word = False
+        self.word_count = 0  # Number of words ending at or below this node
+
+class Trie:
+    def __init__(self):
+        self.root = TrieNode()
+        self._halves = OrderedDict()  # min word length -> half index, least recently used first
+        self._lock = threading.Lock()
+    
+    def insert(self, word):
+        node = self.root
+        path = [node]
+        for char in word:
+            if char not in node.children:
+                node.children[char] = TrieNode()
+            node = node.children[char]
+            path.append(node)
+        if node.is_end_of_word:
+            return
+
+        node.is_end_of_word = True
+        for path_node in path:
+            path_node.word_count += 1
+    
+    def search(self, word):
+        node = self.root
+        for char in word:
+            if char not in node.children:
+                return False
+            node = node.children[char]
+        return node.is_end_of_word
+    
+    def starts_with(self, prefix):
+        node = self.root
+        for char in prefix:
+            if char not in node.children:
+                return False
+            node = node.children[char]
+        return True
+
+    # Function to list every word in the trie
+    def words(self):
+        stack = [(self.root, "")]
+        while stack:
+            node, prefix = stack.pop()
+            if node.is_end_of_word:
+                yield prefix
+            for char, child in node.children.items():
+                stack.append((child, prefix + char))
+
+    # Function to get the index used by the bidirectional search for words of at least min_length letters: each word
+    # is split into a first half of len(word) // 2 letters and the rest. Returns a trie of the first halves, a trie of
+    # the reversed second halves, and a map from each first half to its possible second halves.
+    # An index built for a lower minimum also serves higher ones (the search drops the shorter words), so searches reuse
+    # the closest index already built, and only MAX_HALF_INDEXES are kept.
+    def halves(self, min_length=2):
+        min_length = max(min_length, 2)
+        with self._lock:
+            usable = [built_for for built_for in self._halves if built_for <= min_length]
+            if usable:
+                built_for = max(usable)
+                self._halves.move_to_end(built_for)
+                return self._halves[built_for]
+
+            prefix_trie, reverse_trie, split_index = Trie(), Trie(), {}
+            for word in self.words():
+                if len(word) < min_length:
+                    continue
+                prefix, suffix = word[:len(word) // 2], word[len(word) // 2:]
+                prefix_trie.insert(prefix)
+                reverse_trie.insert(suffix[::-1])
+                split_index.setdefault(prefix, set()).add(suffix)
+
+            self._halves[min_length] = (prefix_trie, reverse_trie, split_index)
+            while len(self._halves) > MAX_HALF_INDEXES:
+                self._halves.popitem(last=False)
+            return self._halves[min_length]
+
+# A loaded word list together with its Trie; never mutated after it is built, so it can be swapped atomically
+class Dictionary:
+    def __init__(self, name, words, version=None):
+        self.name = name
+        self.words = frozenset(words)
+        self.version = version
+
+        # Build Trie for valid words
+        self.trie = Trie()
+        for word in self.words:
+            self.trie.insert(word)
+
+        # Word ids are positions in the sorted word list; the fingerprint identifies the exact list they index,
+        # so data stored by word id (e.g. theme bitsets) can tell when it was built for a different list
+        self.sorted_words = tuple(sorted(self.words))
+        self.fingerprint = hashlib.sha256("\n".join(self.sorted_words).encode()).hexdigest()
+
+    # Function to get a word's id, or None if the word isn't in the dictionary
+    def word_id(self, word):
+        index = bisect_left(self.sorted_words, word)
+        if index < len(self.sorted_words) and self.sorted_words[index] == word:
+            return index
+        return None
+
+# Function to load the NLTK words (nltk is imported here so that importing the app stays fast)
+def load_nltk_words():
+    import nltk
+    from nltk.corpus import words
+
+    # Download necessary resources
+    nltk.download('words', quiet=True)
+    return set(word.lower() for word in words.words())
+
+# Function to load a word list file with one word per line (blank lines and "#" comments are skipped)
+def load_word_file(path):
+    with open(path) as f:
+        return set(line.strip().lower() for line in f if line.strip() and not line.startswith("#"))
+
+# Keeps several named dictionaries loaded lazily, evicting the least recently used ones and rebuilding changed ones in the background
+class DictionaryManager:
+    def __init__(self, directory, default=NLTK_DICTIONARY, max_loaded=3, check_interval=5.0, halves_min_length=None):
+        self.directory = directory
+        self.default = default
+        self.max_loaded = max_loaded
+        self.check_interval = check_interval
+        self.halves_min_length = halves_min_length  # Half-word index built with every dictionary, before it is swapped in
+
+        # Callbacks run with the dictionary name whenever a dictionary is swapped in or evicted
+        self.on_swap = []
+
+        self._loaded = OrderedDict()
+        self._lock = threading.Lock()
+        self._build_locks = defaultdict(threading.Lock)
+        self._rebuilding = set()
+        self._last_checked = {}
+
+    # Names of every dictionary that can be loaded: the NLTK corpus plus each "<name>.txt" in the directory
+    def names(self):
+        names = {NLTK_DICTIONARY}
+        if os.path.isdir(self.directory):
+            names.update(filename[:-4] for filename in os.listdir(self.directory) if filename.endswith(".txt"))
+        return sorted(names)
+
+    def loaded_names(self):
+        with self._lock:
+            return list(self._loaded)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"{name}.txt")
+
+    # The version of a dictionary's source, so changed word lists can be detected
+    def _source_version(self, name):
+        if name == NLTK_DICTIONARY:
+            return None
+        return os.path.getmtime(self._path(name))
+
+    def _build(self, name):
+        if name not in self.names():
+            raise KeyError(name)
+        version = self._source_version(name)
+        start_time = time.time()
+        words = load_nltk_words() if name == NLTK_DICTIONARY else load_word_file(self._path(name))
+        dictionary = Dictionary(name, words, version)
+        if self.halves_min_length is not None:
+            dictionary.trie.halves(self.halves_min_length)
+        logger.info("Built dictionary %r (%d words) in %.2f seconds", name, len(dictionary.words), time.time() - start_time)
+        return dictionary
+
+    # Function to swap a freshly built dictionary in, evicting the least recently used ones (never the default)
+    def _swap(self, dictionary):
+        evicted = []
+        with self._lock:
+            self._loaded[dictionary.name] = dictionary
+            self._loaded.move_to_end(dictionary.name)
+            self._last_checked[dictionary.name] = time.time()
+            for name in list(self._loaded):
+                if len(self._loaded) <= self.max_loaded:
+                    break
+                if name != self.default and name != dictionary.name:
+                    del self._loaded[name]
+                    evicted.append(name)
+
+        for name in [dictionary.name] + evicted:
+            for callback in self.on_swap:
+                callback(name)
+
+    # Function to get a dictionary by name, loading it on first use; requests already holding the old one keep using it
+    def get(self, name=None):
+        dictionary = self.get_loaded(name)
+        if dictionary is None:
+            return self._load(name or self.default)
+        return dictionary
+
+    # Function to get a dictionary only if it is already loaded (None otherwise), so callers that mustn't block
+    # on a build can tell whether they need to load it elsewhere
+    def get_loaded(self, name=None):
+        name = name or self.default
+        if not isinstance(name, str):
+            raise KeyError(name)
+        with self._lock:
+            dictionary = self._loaded.get(name)
+            if dictionary is not None:
+                self._loaded.move_to_end(name)
+
+        if dictionary is not None:
+            self._check_for_changes(dictionary)
+        return dictionary
+
+    def _load(self, name):
+        # Unknown names are rejected before they get a build lock, so requests can't grow the lock map without bound
+        if name not in self.names():
+            raise KeyError(name)
+
+        # Only one thread builds a given dictionary, the others wait for it
+        with self._lock:
+            build_lock = self._build_locks[name]
+        with build_lock:
+            with self._lock:
+                dictionary = self._loaded.get(name)
+            if dictionary is None:
+                dictionary = self._build(name)
+                self._swap(dictionary)
+            return dictionary
+
+    # Function to start a background rebuild if the dictionary's source has changed since it was built
+    def _check_for_changes(self, dictionary):
+        now = time.time()
+        with self._lock:
+            if now - self._last_checked.get(dictionary.name, 0) < self.check_interval:
+                return
+            self._last_checked[dictionary.name] = now
+
+        try:
+            changed = self._source_version(dictionary.name) != dictionary.version
+        except OSError:
+            # The file was removed; keep serving the copy we already have
+            return
+        if changed:
+            self.reload(dictionary.name)
+
+    # Function to rebuild a dictionary on a background thread and swap it in once it is ready
+    def reload(self, name):
+        with self._lock:
+            if name in self._rebuilding:
+                return False
+            self._rebuilding.add(name)
+
+        def rebuild():
+            try:
+                self._swap(self._build(name))
+            except Exception:
+                logger.exception("Failed to rebuild dictionary %r", name)
+            finally:
+                with self._lock:
+                    self._rebuilding.discard(name)
+
+        threading.Thread(target=rebuild, name=f"dictionary-rebuild-{name}", daemon=True).start()
+        return True
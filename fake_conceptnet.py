@@ -0,0 +1,171 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, urlencode
+import argparse
+import threading
+import random
+import json
+import time
+
+# Relatedness used when no data file is given: theme -> words that share an edge with it
+DEFAULT_RELATED = {
+    "planet": ["venus", "mars", "saturn", "earth", "star", "sun", "orbit", "moon", "planet"],
+    "chess": ["pawn", "king", "queen", "rook", "bishop", "knight", "check", "mate", "board"],
+    "food": ["bread", "meat", "fruit", "rice", "egg", "pie", "eat", "meal", "corn"],
+    "animals": ["cat", "dog", "pig", "cow", "rat", "ant", "bee", "hen", "ram"],
+}
+
+# Threaded HTTP server with a listen backlog deep enough for load tests (the default of 5 turns bursts of new
+# connections into retried SYNs, which look like upstream latency)
+class FakeServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+# Local stand-in for the ConceptNet /query API with configurable latency, errors and scripted failure phases
+class FakeConceptNet:
+    def __init__(self, related=None, host="127.0.0.1", port=0, latency_ms=0.0, jitter_ms=0.0,
+                 slow_rate=0.0, slow_ms=0.0, error_rate=0.0, script=None, seed=None):
+        self.related = {theme: set(words) for theme, words in (related or DEFAULT_RELATED).items()}
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slow_rate = slow_rate
+        self.slow_ms = slow_ms
+        self.error_rate = error_rate
+
+        # Scripted phases, e.g. [{"requests": 20, "mode": "error"}, {"requests": 20, "mode": "slow", "delay_ms": 3000}],
+        # played in order by request count before falling back to the random distributions above
+        self.script = list(script or [])
+        self.counters = {"requests": 0, "errors": 0, "slow": 0}
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = FakeServer((host, port), self._make_handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-conceptnet", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters)
+
+    def is_related(self, a, b):
+        return b in self.related.get(a, ()) or a in self.related.get(b, ())
+
+    # Function to decide how the next request behaves: ("ok" | "error" | "slow", delay in seconds)
+    def _next_behaviour(self):
+        with self._lock:
+            self.counters["requests"] += 1
+            if self.script:
+                phase = self.script[0]
+                phase["requests"] -= 1
+                if phase["requests"] <= 0:
+                    self.script.pop(0)
+                mode = phase.get("mode", "ok")
+                delay = phase.get("delay_ms", self.slow_ms if mode == "slow" else self.latency_ms) / 1000
+            else:
+                roll = self._random.random()
+                if roll < self.error_rate:
+                    mode = "error"
+                elif roll < self.error_rate + self.slow_rate:
+                    mode = "slow"
+                else:
+                    mode = "ok"
+                delay = (self.slow_ms if mode == "slow" else self.latency_ms + self._random.uniform(0, self.jitter_ms)) / 1000
+            if mode != "ok":
+                self.counters["errors" if mode == "error" else "slow"] += 1
+        return mode, delay
+
+    def _edges(self, params):
+        node = params.get("node", [""])[0].split("/")[-1]
+        other = params.get("other", [""])[0].split("/")[-1]
+        if other:
+            related = [other] if self.is_related(node, other) else []
+        else:
+            related = sorted(self.related.get(node, set()) | {theme for theme, words in self.related.items() if node in words})
+        return [{"start": {"@id": f"/c/en/{node}"}, "end": {"@id": f"/c/en/{word}"}} for word in related]
+
+    # Function to build a /query response holding one page of edges, linking to the next page like ConceptNet does
+    def _query(self, params):
+        edges = self._edges(params)
+        offset = int(params.get("offset", ["0"])[0])
+        limit = int(params.get("limit", ["1000"])[0])
+        response = {"edges": edges[offset:offset + limit]}
+        if offset + limit < len(edges):
+            next_params = dict(params, offset=[str(offset + limit)], limit=[str(limit)])
+            response["view"] = {"nextPage": f"/query?{urlencode(next_params, doseq=True)}"}
+        return response
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/stats":
+                    return self._send(200, fake.stats())
+
+                mode, delay = fake._next_behaviour()
+                time.sleep(delay)
+                if mode == "error":
+                    return self._send(503, {"error": "scripted failure"})
+                if url.path != "/query":
+                    return self._send(404, {"error": "not found"})
+                return self._send(200, fake._query(parse_qs(url.query)))
+
+            def _send(self, status, body):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # Keep the console quiet under load
+
+        return Handler
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake ConceptNet server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--related", help="JSON file mapping each theme to its related words")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--script", help="JSON file with a list of scripted phases")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    related = None
+    if args.related:
+        with open(args.related) as f:
+            related = json.load(f)
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    fake = FakeConceptNet(related, args.host, args.port, args.latency_ms, args.jitter_ms, args.slow_rate,
+                          args.slow_ms, args.error_rate, script, args.seed)
+    print(f"Fake ConceptNet listening on {fake.url}")
+    try:
+        fake._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+from concurrent.futures import ThreadPoolExecutor
+import subprocess
+import threading
+import argparse
+import random
+import socket
+import json
+import time
+import sys
+import os
+
+import requests
+
+from fake_conceptnet import FakeConceptNet
+
+# Letter frequencies used to generate boards that look like real ones
+LETTER_WEIGHTS = {
+    'E': 12.0, 'T': 9.1, 'A': 8.1, 'O': 7.7, 'I': 7.3, 'N': 6.9, 'S': 6.3, 'R': 6.0, 'H': 5.9, 'D': 4.3,
+    'L': 4.0, 'U': 2.9, 'C': 2.7, 'M': 2.6, 'F': 2.3, 'Y': 2.1, 'W': 2.1, 'G': 2.0, 'P': 1.8, 'B': 1.5,
+    'V': 1.1, 'K': 0.7, 'X': 0.2, 'Q': 0.1, 'J': 0.1, 'Z': 0.1,
+}
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def percentile(samples, p):
+    if not samples:
+        return None
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * p / 100))]
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_DIR, stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+# Function to start the Flask app in a subprocess pointed at the fake ConceptNet, and wait until it is ready
+def start_app(port, conceptnet_url, timeout):
+    env = dict(os.environ, CONCEPTNET_URL=conceptnet_url)
+    process = subprocess.Popen(
+        [sys.executable, "-c", f"import wsgi; wsgi.app.run(host='127.0.0.1', port={port}, threaded=True)"],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("The app exited before becoming ready")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}/readyz", timeout=1).status_code == 200:
+                return process
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"The app did not become ready within {timeout} seconds")
+
+# Function to build the request mix: random boards and themes, with a share of requests repeating earlier ones
+def build_workload(args, rng):
+    boards = []
+    if args.boards:
+        with open(args.boards) as f:
+            boards = [json.loads(line)["grid"] for line in f if line.strip()]
+    letters, weights = zip(*LETTER_WEIGHTS.items())
+
+    workload = []
+    for _ in range(args.requests):
+        if workload and rng.random() < args.repeat_rate:
+            workload.append(rng.choice(workload))
+            continue
+        grid = rng.choice(boards) if boards else rng.choices(letters, weights, k=16)
+        workload.append({
+            "grid": grid,
+            "theme": rng.choice(args.themes),
+            "min_length": args.min_length,
+            "max_length": args.max_length,
+            "theme_first": rng.random() < args.theme_first_rate,
+        })
+    return workload
+
+# Function to send the workload open-loop at the target rate and collect per-request latencies and statuses
+def drive(url, workload, rps, concurrency, timeout):
+    local = threading.local()
+    results = []
+    lock = threading.Lock()
+
+    # Latency counts from when the request was scheduled, not from when a sender thread picked it up, so time spent
+    # waiting for a free sender once --concurrency is saturated isn't left out of the percentiles (coordinated omission)
+    def send(payload, scheduled_time):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        send_lag = time.perf_counter() - scheduled_time
+        try:
+            status = local.session.post(f"{url}/solve", json=payload, timeout=timeout).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        with lock:
+            results.append((status, time.perf_counter() - scheduled_time, send_lag))
+
+    run_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for i, payload in enumerate(workload):
+            # Requests are sent on a fixed schedule whether or not earlier ones have finished
+            scheduled_time = run_start + i / rps
+            delay = scheduled_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(send, payload, scheduled_time)
+    return results, time.perf_counter() - run_start
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test /solve against a local fake ConceptNet.")
+    parser.add_argument("--rps", type=float, default=20.0, help="target requests per second")
+    parser.add_argument("--requests", type=int, default=200, help="total requests to send")
+    parser.add_argument("--concurrency", type=int, default=64, help="most requests in flight at once")
+    parser.add_argument("--themes", nargs="+", default=["planet", "chess", "food", "animals"])
+    parser.add_argument("--boards", help="JSONL file of boards to draw from (random boards if not given)")
+    parser.add_argument("--repeat-rate", type=float, default=0.2, help="share of requests repeating an earlier one")
+    parser.add_argument("--theme-first-rate", type=float, default=0.0, help="share of requests using theme_first")
+    parser.add_argument("--min-length", type=int, default=3)
+    parser.add_argument("--max-length", type=int, default=16)
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--upstream-slow-rate", type=float, default=0.01)
+    parser.add_argument("--upstream-slow-ms", type=float, default=2000.0)
+    parser.add_argument("--upstream-error-rate", type=float, default=0.0)
+    parser.add_argument("--url", help="test an already running server instead of starting one (upstream counts then cover only the fake started here)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="per-request timeout in seconds")
+    parser.add_argument("--startup-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    fake = FakeConceptNet(
+        latency_ms=args.upstream_latency_ms, jitter_ms=args.upstream_jitter_ms, slow_rate=args.upstream_slow_rate,
+        slow_ms=args.upstream_slow_ms, error_rate=args.upstream_error_rate, seed=args.seed,
+    ).start()
+
+    process = None
+    try:
+        url = args.url
+        if not url:
+            port = free_port()
+            print(f"Starting the app on port {port} (fake ConceptNet at {fake.url})", file=sys.stderr)
+            process = start_app(port, fake.url, args.startup_timeout)
+            url = f"http://127.0.0.1:{port}"
+
+        # Don't count the warm-up's upstream calls
+        upstream_before = fake.stats()
+        workload = build_workload(args, rng)
+        print(f"Sending {len(workload)} requests at {args.rps} requests/sec", file=sys.stderr)
+        results, elapsed = drive(url, workload, args.rps, args.concurrency, args.timeout)
+        upstream_after = fake.stats()
+    finally:
+        if process:
+            process.terminate()
+            process.wait()
+        fake.stop()
+
+    latencies = [latency for status, latency, _ in results if status == 200]
+    send_lags = [send_lag for _, _, send_lag in results]
+    statuses = {}
+    for status, _, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "requests": len(results),
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "error_rate": round(1 - len(latencies) / len(results), 4) if results else None,
+        "statuses": statuses,
+        "latency_ms": {
+            name: round(percentile(latencies, p) * 1000, 1) if latencies else None
+            for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))
+        },
+        # How late requests were sent after their scheduled time; large values mean --concurrency was saturated
+        "send_lag_ms": {
+            name: round(percentile(send_lags, p) * 1000, 1) if send_lags else None
+            for name, p in (("p50", 50), ("p99", 99), ("max", 100))
+        },
+        "upstream_calls": upstream_after["requests"] - upstream_before["requests"],
+        "upstream_calls_per_request": round((upstream_after["requests"] - upstream_before["requests"]) / len(results), 2) if results else None,
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+from concurrent.futures import Future, TimeoutError
+import threading
+import hashlib
+import logging
+import json
+import time
+import os
+
+from cancellation import SolveCancelled
+
+logger = logging.getLogger(__name__)
+
+# Coalesces identical concurrent calls: the first caller computes, and duplicates wait for and share its result.
+# Threads coalesce through a shared future; worker processes coalesce through a lock file and result file per key
+# in `directory` (only when a directory is given and the platform supports fcntl locks).
+class SingleFlight:
+    def __init__(self, directory=None, ttl=5.0, poll_interval=0.1):
+        self.directory = directory
+        self.ttl = ttl  # How long a finished result is shared with processes that were waiting on the lock
+        self.poll_interval = poll_interval  # How often waiting callers check their own cancellation token
+        self.counters = {"calls": 0, "coalesced": 0}
+
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        if directory:
+            try:
+                import fcntl  # noqa: F401
+                os.makedirs(directory, exist_ok=True)
+            except ImportError:
+                logger.warning("File locks aren't supported here, so requests are only coalesced within a process")
+                self.directory = None
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, in_flight=len(self._calls))
+
+    # Function to run fn() once for all concurrent callers with the same key (the key must be JSON serialisable).
+    # A caller waiting on someone else's call raises SolveCancelled as soon as its own cancel_token trips.
+    def do(self, key, fn, cancel_token=None):
+        key = json.dumps(key, sort_keys=True)
+        with self._lock:
+            self.counters["calls"] += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.counters["coalesced"] += 1
+
+        if not leader:
+            return self._wait(future, cancel_token)
+
+        try:
+            result = self._do_across_processes(key, fn, cancel_token) if self.directory else fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    # Function to wait for another caller's result, giving up once our own token trips
+    def _wait(self, future, cancel_token):
+        while True:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise SolveCancelled(cancel_token.reason)
+            try:
+                return future.result(timeout=self.poll_interval)
+            except TimeoutError:
+                pass
+
+    # Function to take the per-key file lock, giving up once our own token trips
+    def _lock_file(self, lock_file, cancel_token):
+        import fcntl
+        while True:
+            if cancel_token is not None and cancel_token.cancelled:
+                raise SolveCancelled(cancel_token.reason)
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                time.sleep(self.poll_interval)
+
+    def _do_across_processes(self, key, fn, cancel_token=None):
+        import fcntl
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        result_path = os.path.join(self.directory, f"{digest}.json")
+
+        with open(os.path.join(self.directory, f"{digest}.lock"), "w") as lock_file:
+            # Waits while another process computes the same key
+            self._lock_file(lock_file, cancel_token)
+            try:
+                try:
+                    if time.time() - os.path.getmtime(result_path) < self.ttl:
+                        with open(result_path) as f:
+                            result = json.load(f)
+                        with self._lock:
+                            self.counters["coalesced"] += 1
+                        return result
+                except (OSError, ValueError):
+                    pass  # No recent result from another process, so compute it here
+
+                result = fn()
+
+                # Write the result atomically so waiting processes never read a partial file
+                tmp_path = f"{result_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(result, f)
+                os.replace(tmp_path, result_path)
+                self._sweep()
+                return result
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    # Function to remove expired results every so often, so the directory doesn't grow without bound
+    def _sweep(self):
+        with self._lock:
+            self._writes += 1
+            if self._writes % 100:
+                return
+        cutoff = time.time() - max(self.ttl * 10, 60)
+        for filename in os.listdir(self.directory):
+            path = os.path.join(self.directory, filename)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,144 @@
+import multiprocessing
+import argparse
+import itertools
+import json
+import time
+import sys
+import os
+
+import app
+from conceptnet import ConceptNetClient
+
+# Options shared by every board in the run (each board can override them), set in the parent before the pool starts
+options = {}
+
+# Function to prepare a worker process: forked workers share the parent's dictionary, spawned ones load their own
+def init_worker(worker_options):
+    options.update(worker_options)
+    # The parent's ConceptNet client owns threads that don't survive a fork, so each worker gets its own
+    app.conceptnet = ConceptNetClient()
+    options["dictionary"] = app.dictionaries.get(options["dictionary_name"])
+
+# Function to solve a single board from one JSONL line, returning its result as a JSONL line
+def solve_line(numbered_line):
+    line_number, line = numbered_line
+    # Errors carry the board's own id once the line has been parsed, so failed boards can be matched to the input
+    board_id = line_number
+    try:
+        board = json.loads(line)
+        board_id = board.get("id", line_number)
+        grid = board.get("grid", [])
+        grid_2d = grid if grid and isinstance(grid[0], list) else app.to_grid_2d(grid)
+        error = app.grid_error(grid_2d)
+        if error:
+            return json.dumps({"id": board_id, "error": error})
+        min_length = board.get("min_length", options["min_length"])
+        max_length = board.get("max_length", options["max_length"])
+        theme = board.get("theme", options["theme"])
+
+        wildcards = {}
+        if theme:
+            words_found = app.solve_board(grid_2d, min_length, max_length, theme, options["dictionary"], options["theme_first"], wildcards=wildcards)
+        else:
+            words_found = app.word_search(grid_2d, min_length, max_length, options["dictionary"].trie, 1, wildcards=wildcards)
+        return json.dumps(dict(app.board_result(sorted(words_found), wildcards), id=board_id))
+    except Exception as e:
+        return json.dumps({"id": board_id, "error": str(e)})
+
+def read_checkpoint(path):
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {"lines_done": 0, "output_bytes": 0}
+
+# Function to record progress atomically, so an interrupted run can resume from the last completed window
+def write_checkpoint(path, lines_done, output_bytes):
+    if not path:
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"lines_done": lines_done, "output_bytes": output_bytes}, f)
+    os.replace(tmp_path, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Solve a corpus of boards from a JSONL file (one {\"grid\": [...]} object per line).")
+    parser.add_argument("input", nargs="?", default="-", help="JSONL file of boards, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file to write results to, or - for stdout")
+    parser.add_argument("--checkpoint", help="checkpoint file used to resume an interrupted run (requires an output file)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--window", type=int, default=1000, help="boards read into memory at a time")
+    parser.add_argument("--min-length", type=int, default=3)
+    parser.add_argument("--max-length", type=int, default=16)
+    parser.add_argument("--theme", default="", help="only keep words related to this theme (boards can set their own)")
+    parser.add_argument("--theme-first", action="store_true", help="search only the theme's vocabulary")
+    parser.add_argument("--dictionary", default=None, help="dictionary to search (the default dictionary if not given)")
+    parser.add_argument("--progress-interval", type=float, default=10.0, help="seconds between throughput reports")
+    args = parser.parse_args(argv)
+
+    if args.checkpoint and args.output == "-":
+        parser.error("--checkpoint needs an output file")
+
+    worker_options = {
+        "min_length": args.min_length,
+        "max_length": args.max_length,
+        "theme": args.theme,
+        "theme_first": args.theme_first,
+        "dictionary_name": args.dictionary or app.dictionaries.default,
+    }
+
+    # Load the dictionary once in the parent; with fork the workers share it instead of building their own
+    start_time = time.time()
+    app.dictionaries.get(worker_options["dictionary_name"])
+    print(f"Dictionary ready in {time.time() - start_time:.2f} seconds", file=sys.stderr)
+
+    # Resume after the last completed window, dropping any output written after it
+    checkpoint = read_checkpoint(args.checkpoint)
+    lines_done = checkpoint["lines_done"]
+    input_file = sys.stdin if args.input == "-" else open(args.input)
+    if args.output == "-":
+        output_file = sys.stdout
+    elif args.checkpoint:
+        output_file = open(args.output, "a+")
+        output_file.truncate(checkpoint["output_bytes"])
+        output_file.seek(0, os.SEEK_END)
+    else:
+        output_file = open(args.output, "w")
+
+    numbered_lines = ((number, line) for number, line in enumerate(input_file) if line.strip())
+    numbered_lines = itertools.dropwhile(lambda numbered_line: numbered_line[0] < lines_done, numbered_lines)
+
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+
+    boards_done = 0
+    run_start = last_report = time.time()
+    with context.Pool(args.workers, initializer=init_worker, initargs=(worker_options,)) as pool:
+        while True:
+            # Only one window of boards is held in memory at a time
+            window = list(itertools.islice(numbered_lines, args.window))
+            if not window:
+                break
+
+            for result in pool.imap(solve_line, window, chunksize=max(1, len(window) // (args.workers * 4))):
+                output_file.write(result + "\n")
+            output_file.flush()
+
+            boards_done += len(window)
+            lines_done = window[-1][0] + 1
+            write_checkpoint(args.checkpoint, lines_done, output_file.tell() if output_file is not sys.stdout else 0)
+
+            now = time.time()
+            if now - last_report >= args.progress_interval:
+                print(f"{boards_done} boards solved, {boards_done / (now - run_start):.1f} boards/sec", file=sys.stderr)
+                last_report = now
+
+    elapsed = time.time() - run_start
+    print(f"Done: {boards_done} boards in {elapsed:.2f} seconds ({boards_done / elapsed if elapsed else 0:.1f} boards/sec)", file=sys.stderr)
+
+    if input_file is not sys.stdin:
+        input_file.close()
+    if output_file is not sys.stdout:
+        output_file.close()
+
+if __name__ == '__main__':
+    main()
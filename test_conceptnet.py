@@ -0,0 +1,179 @@
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import asyncio
+import unittest
+import time
+import os
+
+import app
+from conceptnet import AsyncConceptNetClient, CircuitBreaker, ConceptNetClient, ConceptNetUnavailable
+from fake_conceptnet import FakeConceptNet
+
+# Tests for the ConceptNet client against a local fake ConceptNet server with scripted failures
+class ConceptNetClientTest(unittest.TestCase):
+    def start_fake(self, **kwargs):
+        fake = FakeConceptNet(**kwargs).start()
+        self.addCleanup(fake.stop)
+        return fake
+
+    # Function to make a client for the fake; hedging stays off unless the test asks for it
+    def client(self, fake, breaker=None, **kwargs):
+        kwargs.setdefault("hedge_min_samples", 1000)
+        client = ConceptNetClient(fake.url, breaker=breaker or CircuitBreaker(min_calls=5), **kwargs)
+        self.addCleanup(client._executor.shutdown)
+        return client
+
+    # Function to make calls that are expected to fail, returning how many did
+    def failing_calls(self, client, count):
+        failures = 0
+        for _ in range(count):
+            try:
+                client.is_related("venus", "planet")
+            except ConceptNetUnavailable:
+                failures += 1
+        return failures
+
+    def test_breaker_trips_on_errors(self):
+        fake = self.start_fake(script=[{"requests": 5, "mode": "error"}])
+        client = self.client(fake)
+
+        self.assertEqual(self.failing_calls(client, 5), 5)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        # While the circuit is open, calls are rejected without reaching ConceptNet
+        self.assertEqual(self.failing_calls(client, 3), 3)
+        self.assertEqual(fake.stats()["requests"], 5)
+        self.assertEqual(client.stats()["rejected"], 3)
+
+    def test_breaker_trips_on_slow_calls(self):
+        fake = self.start_fake(script=[{"requests": 5, "mode": "slow", "delay_ms": 300}])
+        client = self.client(fake, CircuitBreaker(min_calls=5, slow_call=0.2))
+
+        # Slow calls still succeed, but they open the circuit
+        for _ in range(5):
+            self.assertTrue(client.is_related("venus", "planet"))
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.failing_calls(client, 1), 1)
+
+    def test_half_open_probe_recovers(self):
+        fake = self.start_fake(script=[{"requests": 5, "mode": "error"}])
+        client = self.client(fake, CircuitBreaker(min_calls=5, reset_timeout=0.2))
+        self.failing_calls(client, 5)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+        # After the reset timeout a single probe goes through, and its success closes the circuit
+        time.sleep(0.3)
+        self.assertTrue(client.is_related("venus", "planet"))
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(fake.stats()["requests"], 6)
+
+    def test_failed_probe_reopens(self):
+        fake = self.start_fake(script=[{"requests": 6, "mode": "error"}])
+        client = self.client(fake, CircuitBreaker(min_calls=5, reset_timeout=0.2))
+        self.failing_calls(client, 5)
+
+        time.sleep(0.3)
+        self.assertEqual(self.failing_calls(client, 1), 1)
+        self.assertEqual(client.breaker.state, CircuitBreaker.OPEN)
+
+    def test_hedges_calls_slower_than_p95(self):
+        fake = self.start_fake(script=[{"requests": 20, "mode": "ok", "delay_ms": 10}, {"requests": 1, "mode": "slow", "delay_ms": 2000}])
+        client = self.client(fake, hedge_min_samples=20)
+        for _ in range(20):
+            client.is_related("venus", "planet")
+        self.assertEqual(client.stats()["hedged"], 0)
+
+        # The next request stalls, so a duplicate is sent after the p95 latency and answers first
+        start_time = time.monotonic()
+        self.assertTrue(client.is_related("venus", "planet"))
+        self.assertLess(time.monotonic() - start_time, 1.0)
+        self.assertEqual(client.stats()["hedged"], 1)
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_follows_pagination(self):
+        words = [f"word{i}" for i in range(250)]
+        fake = self.start_fake(related={"food": words})
+        client = self.client(fake)
+        self.assertEqual(client.related_terms("food", limit=100), set(words))
+        self.assertEqual(fake.stats()["requests"], 3)
+
+    # Many concurrent checks against a healthy but not instant upstream queue for the client's workers; time spent
+    # waiting for a worker is local and mustn't count as upstream latency or open the circuit
+    def test_queueing_for_workers_does_not_open_the_circuit(self):
+        fake = self.start_fake(latency_ms=500)
+        client = ConceptNetClient(fake.url)
+        self.addCleanup(client._executor.shutdown)
+
+        with ThreadPoolExecutor(max_workers=100) as executor:
+            results = list(executor.map(lambda _: self.failing_calls(client, 1), range(100)))
+
+        self.assertEqual(sum(results), 0)
+        self.assertEqual(client.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(client.stats()["rejected"], 0)
+        # Hedges only go out once the queue has drained and workers are free, so at most one per worker at the tail
+        self.assertLessEqual(client.stats()["hedged"], client.max_workers)
+        self.assertEqual(client._queued, 0)
+
+# Tests for the asyncio client's circuit breaker against the fake ConceptNet server
+class AsyncConceptNetClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fake = FakeConceptNet(script=[{"requests": 5, "mode": "error"}, {"requests": 1, "mode": "slow", "delay_ms": 2000}]).start()
+        self.addCleanup(self.fake.stop)
+        self.client = AsyncConceptNetClient(self.fake.url, breaker=CircuitBreaker(min_calls=5, reset_timeout=0.2), hedge_min_samples=1000)
+        self.addAsyncCleanup(self.client.close)
+
+    # A half-open probe whose caller is cancelled has no outcome, so the next call must be let through to probe again
+    async def test_cancelled_probe_frees_the_circuit(self):
+        for _ in range(5):
+            with self.assertRaises(ConceptNetUnavailable):
+                await self.client.is_related("venus", "planet")
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+        await asyncio.sleep(0.3)
+        probe = asyncio.ensure_future(self.client.is_related("venus", "planet"))
+        await asyncio.sleep(0.2)
+        probe.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await probe
+        self.assertFalse(self.client.breaker.probing)
+
+        self.assertTrue(await self.client.is_related("venus", "planet"))
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+        self.assertEqual(self.fake.stats()["requests"], 7)
+
+# Tests for the app's fallback to local theme vocabularies while ConceptNet is unavailable
+class LocalVocabularyFallbackTest(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeConceptNet(error_rate=1.0).start()
+        self.addCleanup(self.fake.stop)
+
+        vocabulary_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(vocabulary_dir.cleanup)
+        with open(os.path.join(vocabulary_dir.name, "space.txt"), "w") as f:
+            f.write("venus\nmars\n")
+
+        conceptnet, vocabulary_dir_name = app.conceptnet, app.THEME_VOCABULARY_DIR
+        app.conceptnet = ConceptNetClient(self.fake.url, breaker=CircuitBreaker(min_calls=2))
+        app.THEME_VOCABULARY_DIR = vocabulary_dir.name
+        self.addCleanup(setattr, app, "conceptnet", conceptnet)
+        self.addCleanup(setattr, app, "THEME_VOCABULARY_DIR", vocabulary_dir_name)
+        self.addCleanup(app.conceptnet._executor.shutdown)
+        for cache in (app.get_local_theme_vocabulary, app.is_word_related_to_theme_conceptnet):
+            cache.cache_clear()
+            self.addCleanup(cache.cache_clear)
+
+    def test_falls_back_to_local_vocabulary(self):
+        self.assertTrue(app.is_word_related_to_theme("venus", "space"))
+        self.assertFalse(app.is_word_related_to_theme("pawn", "space"))
+
+        # Once the circuit is open the fallback answers without calling upstream
+        requests = self.fake.stats()["requests"]
+        self.assertTrue(app.is_word_related_to_theme("mars", "space"))
+        self.assertEqual(app.conceptnet.breaker.state, CircuitBreaker.OPEN)
+        self.assertEqual(self.fake.stats()["requests"], requests)
+
+    def test_themes_without_a_local_vocabulary_are_unrelated(self):
+        self.assertFalse(app.is_word_related_to_theme("venus", "astronomy"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import random
+import unittest
+
+import app
+from dictionary import Dictionary
+
+LETTERS = "aeilnorst"
+
+# Function to make a seeded 4x4 board from a few common letters, so words are re-found from many paths
+def random_board(rng):
+    return [[rng.choice(LETTERS) for _ in range(4)] for _ in range(4)]
+
+# Function to spell a random path of the given length through the board (None if the walk gets stuck)
+def random_walk(rng, grid, length):
+    x, y = rng.randrange(4), rng.randrange(4)
+    visited, word = {(x, y)}, grid[x][y]
+    while len(word) < length:
+        steps = [(x + dx, y + dy) for dx, dy in app.directions if 0 <= x + dx < 4 and 0 <= y + dy < 4 and (x + dx, y + dy) not in visited]
+        if not steps:
+            return None
+        x, y = rng.choice(steps)
+        visited.add((x, y))
+        word += grid[x][y]
+    return word
+
+# Tests that the search's engines and pruning find exactly what the plain forward search finds
+class WordSearchTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # A small word list with words of every length that are on the boards, plus random words that mostly aren't
+        rng = random.Random(7)
+        cls.boards = [random_board(rng) for _ in range(8)]
+        words = set()
+        for grid in cls.boards:
+            for _ in range(300):
+                word = random_walk(rng, grid, rng.randint(1, 12))
+                if word:
+                    words.add(word)
+        for _ in range(2000):
+            words.add("".join(rng.choice(LETTERS) for _ in range(rng.randint(2, 12))))
+        cls.dictionary = Dictionary("test", words)
+
+    def search(self, grid, min_length, **kwargs):
+        return app.word_search(grid, min_length, 16, self.dictionary.trie, max_workers=1, **kwargs)
+
+    def test_bidirectional_matches_forward(self):
+        for grid in self.boards:
+            for min_length in (1, 2, 3, 5, 8, 11):
+                with self.subTest(grid=grid, min_length=min_length):
+                    forward = self.search(grid, min_length, engine="forward")
+                    self.assertTrue(forward)
+                    self.assertEqual(self.search(grid, min_length, engine="bidirectional"), forward)
+
+    def test_pruning_matches_full_search(self):
+        # Some boards get wildcard tiles, whose words stay open until their fewest-wildcard path is known
+        boards = self.boards + [[row[:] for row in grid] for grid in self.boards[:4]]
+        for index, grid in enumerate(boards[len(self.boards):]):
+            grid[index % 4][index] = app.WILDCARD
+            grid[3 - index % 4][(index + 2) % 4] = app.WILDCARD
+
+        for grid in boards:
+            for min_length in (1, 3, 6):
+                with self.subTest(grid=grid, min_length=min_length):
+                    full_wildcards, pruned_wildcards, stats = {}, {}, {}
+                    full = self.search(grid, min_length, engine="forward", prune_exhausted=False, wildcards=full_wildcards)
+                    pruned = self.search(grid, min_length, engine="forward", prune_exhausted=True, wildcards=pruned_wildcards, stats=stats)
+                    self.assertEqual(pruned, full)
+                    self.assertEqual(pruned_wildcards, full_wildcards)
+                    self.assertEqual(bool(full_wildcards), any(app.WILDCARD in row for row in grid))
+                    self.assertGreater(stats["pruned"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
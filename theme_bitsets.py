@@ -0,0 +1,137 @@
+import threading
+import logging
+import mmap
+import json
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Precomputed theme relatedness is stored per dictionary as a manifest ("<dictionary>.json") and a data file holding one
+# bitset per theme. Bitsets are indexed by word id (see Dictionary.word_id): bit i of a theme's bitset is set when the
+# dictionary's i-th word is related to the theme. Data files are memory-mapped, so worker processes share one copy.
+
+# Function to get the number of bytes in one theme's bitset for a dictionary
+def bitset_size(dictionary):
+    return (len(dictionary.sorted_words) + 7) // 8
+
+def manifest_path(directory, dictionary_name):
+    return os.path.join(directory, f"{dictionary_name}.json")
+
+# Function to read a dictionary's manifest, or None if there isn't a readable one
+def read_manifest(directory, dictionary_name):
+    try:
+        with open(manifest_path(directory, dictionary_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+# Function to read the bitsets stored for a dictionary as theme -> bytes (none if they were built for another word list)
+def read_bitsets(directory, dictionary):
+    manifest = read_manifest(directory, dictionary.name)
+    if manifest is None or manifest["fingerprint"] != dictionary.fingerprint:
+        return {}
+    size = manifest["bitset_bytes"]
+    with open(os.path.join(directory, manifest["data"]), "rb") as f:
+        data = f.read()
+    return {theme: data[index * size:(index + 1) * size] for theme, index in manifest["themes"].items()}
+
+# Function to write a dictionary's bitsets (theme -> bytes). Each write goes to a new data file and the manifest is
+# replaced last, so readers never see a manifest pointing at a partial or different file.
+def write_bitsets(directory, dictionary, bitsets):
+    os.makedirs(directory, exist_ok=True)
+    previous = read_manifest(directory, dictionary.name)
+
+    themes = sorted(bitsets)
+    data_name = f"{dictionary.name}-{int(time.time() * 1000)}.bitsets"
+    with open(os.path.join(directory, data_name), "wb") as f:
+        for theme in themes:
+            f.write(bitsets[theme])
+
+    manifest = {
+        "dictionary": dictionary.name,
+        "fingerprint": dictionary.fingerprint,
+        "words": len(dictionary.sorted_words),
+        "bitset_bytes": bitset_size(dictionary),
+        "themes": {theme: index for index, theme in enumerate(themes)},
+        "data": data_name,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    path = manifest_path(directory, dictionary.name)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+    # Processes that mapped the old data file keep their mapping after it is removed
+    if previous and previous.get("data") != data_name:
+        try:
+            os.remove(os.path.join(directory, previous["data"]))
+        except OSError:
+            pass
+
+# One theme's bitset for a dictionary
+class ThemeBitset:
+    def __init__(self, dictionary, data, offset):
+        self.dictionary = dictionary
+        self.data = data
+        self.offset = offset
+
+    # Function to check a word's bit (words outside the dictionary are never related)
+    def __contains__(self, word):
+        word_id = self.dictionary.word_id(word)
+        return word_id is not None and bool(self.data[self.offset + (word_id >> 3)] & (1 << (word_id & 7)))
+
+    # Function to keep the words whose bits are set, i.e. the found words' ids ANDed with the theme's bitset
+    def filter(self, words):
+        return [word for word in words if word in self]
+
+# Looks up precomputed bitsets at request time, mapping a dictionary's data file on first use and again whenever its
+# manifest changes. Bitsets built for a different word list (e.g. before the dictionary file was edited) are ignored.
+class ThemeBitsets:
+    def __init__(self, directory):
+        self.directory = directory
+        self._mapped = {}  # dictionary name -> ((manifest mtime, dictionary fingerprint), (manifest, data) or None)
+        self._lock = threading.Lock()
+
+    # Function to get a theme's bitset for a dictionary, or None if it wasn't precomputed
+    def get(self, dictionary, theme):
+        mapped = self._map(dictionary)
+        if mapped is None:
+            return None
+        manifest, data = mapped
+        index = manifest["themes"].get(theme)
+        if index is None:
+            return None
+        return ThemeBitset(dictionary, data, index * manifest["bitset_bytes"])
+
+    def _map(self, dictionary):
+        if not self.directory:
+            return None
+        try:
+            key = (os.path.getmtime(manifest_path(self.directory, dictionary.name)), dictionary.fingerprint)
+        except OSError:
+            return None
+
+        cached = self._mapped.get(dictionary.name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        with self._lock:
+            cached = self._mapped.get(dictionary.name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+
+            mapped = None
+            manifest = read_manifest(self.directory, dictionary.name)
+            if manifest is not None and manifest["fingerprint"] != dictionary.fingerprint:
+                logger.warning("Theme bitsets for dictionary %r were built for a different word list, so they aren't used", dictionary.name)
+            elif manifest is not None and manifest["themes"]:
+                try:
+                    with open(os.path.join(self.directory, manifest["data"]), "rb") as f:
+                        mapped = (manifest, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+                    logger.info("Mapped theme bitsets for dictionary %r (%s)", dictionary.name, ", ".join(sorted(manifest["themes"])))
+                except (OSError, ValueError):
+                    logger.warning("Could not map the theme bitsets for dictionary %r", dictionary.name, exc_info=True)
+            self._mapped[dictionary.name] = (key, mapped)
+            return mapped
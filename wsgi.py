@@ -0,0 +1,5 @@
+from app import app, start_background_loading
+
+# Entry point for WSGI servers (e.g. `gunicorn wsgi:app`): the dictionary starts loading when the server imports this
+# module, while importing app.py itself (as the command-line tools do) loads nothing
+start_background_loading()